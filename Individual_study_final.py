@@ -1,212 +1,256 @@
+from datetime import date, datetime, timedelta
 import flet as ft
-from datetime import datetime
-import random
 import math
+import os
+import threading
+import time
 
-class SmartHomeController:
-    def __init__(self):
-        self.current_view = "overview"
-        self.devices = {
-            "light1": {"name": "Living Room Light", "type": "light", "status": "OFF", "power": 60},
-            "light2": {"name": "Bedroom Light", "type": "light", "status": "OFF", "power": 40},
-            "light3": {"name": "Kitchen Light", "type": "light", "status": "OFF", "power": 50},
-            "door1": {"name": "Front Door", "type": "door", "status": "LOCKED", "power": 5},
-            "door2": {"name": "Back Door", "type": "door", "status": "LOCKED", "power": 5},
-            "thermostat1": {"name": "Thermostat", "type": "thermostat", "value": 22.0, "power": 200},
-            "fan1": {"name": "Ceiling Fan", "type": "fan", "value": 0, "power": 0},
-            "tv1": {"name": "Smart TV", "type": "tv", "status": "OFF", "power": 150},
-            "camera1": {"name": "Security Camera", "type": "camera", "status": "OFF", "power": 10}
-        }
-        self.action_log = []
-        self.power_data = self.generate_power_data()
+from smart_home import (
+    DAY,
+    HOUR,
+    MINUTE,
+    SCENES,
+    SLIDER_TYPES,
+    ActionLogged,
+    DeviceChanged,
+    DeviceType,
+    Instrumentation,
+    PowerSampled,
+    PowerSampler,
+    RenderScheduler,
+    Retention,
+    SliderCoalescer,
+    SmartHomeController,
+    SnapshotWriter,
+    State,
+    TotalsChanged,
+    controller_gauges,
+    default_rules,
+    format_time,
+    generate_building,
+    lttb,
+)
+from smart_home.drivers import connect
+from smart_home.energy import EnergyMeter
+from smart_home.thermal import ThermalSimulator
 
-    def add_action(self, device, action, user="User"):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.action_log.insert(0, {
-            "time": timestamp,
-            "device": device,
-            "action": action,
-            "user": user
-        })
+GRID_PAGE_SIZE = 12  # device cards built per overview page
+BUILDING_ROOMS = 0  # > 0 replaces the default devices with a generated building
+DEVICE_SERVER = None  # "host:port" of a device server, "simulated" for a local stand-in
+ACTION_LOG_PATH = None  # SQLite file keeping the action log across restarts; None keeps it in memory
+LOG_PAGE_SIZE = 10  # action log rows per Statistics page
+SNAPSHOT_PATH = None  # file saving device state and power history in the background; restored on start
+RAW_LOG_WINDOW = 7 * DAY  # raw log entries kept; older ones are compacted into hourly and daily rollups
+ACTIVITY_DAYS = 30  # days of compacted activity shown in device details
+SIMULATED_HOURS = 0  # > 0 fills the power chart and energy figures with that many simulated hours on start
+ENERGY_ROOMS = 5  # rooms with the highest use today listed in Statistics
+CHART_WINDOW = DAY  # seconds of history in the power chart
+CHART_WIDTH = 630  # pixels
+CHART_SLOTS = CHART_WIDTH // 6  # bars drawn, whatever the window length
+DIAGNOSTICS = os.environ.get("SMART_HOME_DIAGNOSTICS") == "1"  # handler timing and the Diagnostics tab
 
-    def generate_power_data(self):
-        # Generate realistic power consumption data (24 hours)
-        data = []
-        for i in range(24):
-            base = 100
-            if 6 <= i <= 22:  # Daytime usage
-                base = 200 + random.randint(-50, 50)
-            else:  # Nighttime
-                base = 80 + random.randint(-20, 20)
-            data.append(base)
-        return data
+# Icon, icon colour and hint for each card type; doors may override the icon
+CARD_STYLES = {
+    DeviceType.LIGHT: (ft.Icons.LIGHTBULB_OUTLINE, "#FFB74D", "Tap to switch the light."),
+    DeviceType.DOOR: (ft.Icons.DOOR_FRONT_DOOR, "#A1887F", "Tap to lock / unlock the door."),
+    DeviceType.TV: (ft.Icons.TV, "#64B5F6", "Tap to switch the TV."),
+    DeviceType.CAMERA: (ft.Icons.CAMERA_ALT, "#EF5350", "Tap to switch the camera."),
+    DeviceType.THERMOSTAT: (ft.Icons.THERMOSTAT, "#FF7043", "Use slider to change temperature."),
+    DeviceType.FAN: (ft.Icons.AIR, "#4DD0E1", "0 = OFF, 3 = MAX."),
+}
+CARD_ICONS = {"door2": ft.Icons.DOOR_BACK_DOOR}
 
-    def get_current_power(self):
-        total = 0
-        for device_id, device in self.devices.items():
-            if device["type"] in ["light", "door", "tv", "camera"]:
-                if device["status"] == "ON" or (device["type"] == "door" and device["status"] == "LOCKED"):
-                    total += device["power"]
-            elif device["type"] == "thermostat":
-                total += device["power"]
-            elif device["type"] == "fan":
-                total += device["value"] * 50
-        return total
+# Status label, button text and card colour for each toggle state
+STATE_LOOKS = {
+    State.OFF: ("Status: OFF", "Turn ON", "#132F4C"),
+    State.ON: ("Status: ON", "Turn OFF", "#1E3A5F"),
+    State.LOCKED: ("Door: LOCKED", "Unlock", "#132F4C"),
+    State.UNLOCKED: ("Door: UNLOCKED", "Lock", "#2E1534"),
+}
+
+# min, max, divisions, value type, label and log action for each slider type
+SLIDER_SETTINGS = {
+    DeviceType.THERMOSTAT: (15, 30, 30, float, "Set point: {:.1f} °C", "Set to {:.1f}°C"),
+    DeviceType.FAN: (0, 3, 3, int, "Fan speed: {}", "Set speed to {}"),
+}
+
+_home = None  # controller shared by every session
+_home_lock = threading.Lock()
+_home_workers = []  # background workers of the shared controller, stopped by close_home()
+
+def duration_label(seconds):
+    # Whole minutes, hours or (from two days up) days, e.g. 90m, 24h, 7d
+    if seconds >= 2 * DAY and seconds % DAY == 0:
+        return f"{seconds // DAY:g}d"
+    for unit, suffix in ((HOUR, "h"), (MINUTE, "m")):
+        if seconds % unit == 0:
+            return f"{seconds // unit:g}{suffix}"
+    return f"{seconds:g}s"
+
+def local_midnight(timestamp, days_before=0):
+    # Epoch seconds of the local midnight starting the day of `timestamp`, or
+    # days_before days earlier; rollups and power buckets are cut in UTC
+    day = date.fromtimestamp(timestamp) - timedelta(days=days_before)
+    return datetime.combine(day, datetime.min.time()).timestamp()
+
+def shared_home():
+    # One controller, device connection and power sampler per process. In web
+    # mode main() runs once per browser session; all sessions show and change
+    # the same devices, and each one keeps only its own view state.
+    global _home
+    with _home_lock:
+        if _home is None:
+            controller = SmartHomeController(devices=generate_building(BUILDING_ROOMS) if BUILDING_ROOMS else None,
+                                             log_path=ACTION_LOG_PATH, snapshot_path=SNAPSHOT_PATH)
+            if DEVICE_SERVER:
+                def command_failed(device_id, attribute, value, exc):
+                    controller.add_action(device_id, f"Command failed: {exc}", "System")
+                
+                controller.dispatcher = connect(DEVICE_SERVER, on_error=command_failed)
+            controller.energy = EnergyMeter(controller)
+            if SIMULATED_HOURS:
+                # Room temperatures and thermostat cycles up to now, at the current settings
+                duration = SIMULATED_HOURS * HOUR
+                controller.energy.start(time.time() - duration)
+                ThermalSimulator(controller).run(duration, power_series=controller.power_series, energy=controller.energy)
+            controller.energy.start()
+            _home_workers[:] = [controller.energy, PowerSampler(controller, controller.power_series),
+                                Retention(controller, RAW_LOG_WINDOW)]
+            if SNAPSHOT_PATH is not None:
+                _home_workers.append(SnapshotWriter(controller, SNAPSHOT_PATH))
+            for worker in _home_workers[1:]:
+                worker.start()
+            for rule in default_rules(controller.devices):
+                controller.rules.add(rule)
+            _home = controller
+        return _home
+
+def close_home():
+    # Stops the shared controller's threads and closes it; the next session builds a new one
+    global _home
+    with _home_lock:
+        if _home is not None:
+            for worker in _home_workers:
+                worker.stop()
+            _home_workers.clear()
+            if _home.dispatcher is not None:
+                _home.dispatcher.close()
+            _home.close()
+            _home = None
 
 def main(page: ft.Page):
     page.title = "Smart Home Controller + Simulator"
     page.padding = 0
     page.bgcolor = "#0A1929"
     
-    controller = SmartHomeController()
+    controller = shared_home()
+    current_view = "overview"
+    instrumentation = Instrumentation(enabled=DIAGNOSTICS)
+    timed = instrumentation.timed
+    scheduler = RenderScheduler(timed("page.update", page.update))
     
-    def update_summary():
-        active_devices = sum(1 for d in controller.devices.values() 
-                           if (d.get("status") == "ON" or d.get("status") == "UNLOCKED" or 
-                               (d["type"] == "fan" and d.get("value", 0) > 0)))
+    def update_summary(event=None):
         total_devices = len(controller.devices)
         current_power = controller.get_current_power()
         
-        summary_active.value = f"{active_devices}"
+        summary_active.value = f"{controller.active_devices}"
         summary_total.value = f"{total_devices}"
         summary_power.value = f"{current_power}W"
-        page.update()
+        scheduler.mark(summary_active, summary_total, summary_power)
     
-    def toggle_light(device_id, status_text, button, card):
-        def handler(e):
-            device = controller.devices[device_id]
-            if device["status"] == "OFF":
-                device["status"] = "ON"
-                controller.add_action(device_id, "Turn ON")
-                status_text.value = "Status: ON"
-                button.text = "Turn OFF"
-                card.bgcolor = "#1E3A5F"
-            else:
-                device["status"] = "OFF"
-                controller.add_action(device_id, "Turn OFF")
-                status_text.value = "Status: OFF"
-                button.text = "Turn ON"
-                card.bgcolor = "#132F4C"
-            update_summary()
-            page.update()
-        return handler
-    
-    def toggle_door(device_id, status_text, button, card):
-        def handler(e):
-            device = controller.devices[device_id]
-            if device["status"] == "LOCKED":
-                device["status"] = "UNLOCKED"
-                controller.add_action(device_id, "Unlock")
-                status_text.value = "Door: UNLOCKED"
-                button.text = "Lock"
-                card.bgcolor = "#2E1534"
-            else:
-                device["status"] = "LOCKED"
-                controller.add_action(device_id, "Lock")
-                status_text.value = "Door: LOCKED"
-                button.text = "Unlock"
-                card.bgcolor = "#132F4C"
-            update_summary()
-            page.update()
-        return handler
-    
-    def toggle_tv(e):
-        if controller.devices["tv1"]["status"] == "OFF":
-            controller.devices["tv1"]["status"] = "ON"
-            controller.add_action("tv1", "Turn ON")
-            tv_status.value = "Status: ON"
-            tv_button.text = "Turn OFF"
-            tv_card.bgcolor = "#1E3A5F"
-        else:
-            controller.devices["tv1"]["status"] = "OFF"
-            controller.add_action("tv1", "Turn OFF")
-            tv_status.value = "Status: OFF"
-            tv_button.text = "Turn ON"
-            tv_card.bgcolor = "#132F4C"
-        update_summary()
-        page.update()
-    
-    def toggle_camera(e):
-        if controller.devices["camera1"]["status"] == "OFF":
-            controller.devices["camera1"]["status"] = "ON"
-            controller.add_action("camera1", "Turn ON")
-            camera_status.value = "Status: ON"
-            camera_button.text = "Turn OFF"
-            camera_card.bgcolor = "#1E3A5F"
-        else:
-            controller.devices["camera1"]["status"] = "OFF"
-            controller.add_action("camera1", "Turn OFF")
-            camera_status.value = "Status: OFF"
-            camera_button.text = "Turn ON"
-            camera_card.bgcolor = "#132F4C"
-        update_summary()
-        page.update()
+    def render_toggle(device, status_text, button, card):
+        status_text.value, button.text, card.bgcolor = STATE_LOOKS[device.state]
     
-    def change_temperature(e):
-        controller.devices["thermostat1"]["value"] = e.control.value
-        temp_value.value = f"Set point: {e.control.value:.1f} °C"
-        controller.add_action("thermostat1", f"Set to {e.control.value:.1f}°C")
-        update_summary()
-        page.update()
+    def toggle_device(device_id):
+        # The card and the summary are refreshed by their event subscriptions,
+        # in this session and in every other one
+        def handler(e):
+            controller.toggle(device_id)
+        return timed("toggle", handler)
     
-    def change_fan_speed(e):
-        controller.devices["fan1"]["value"] = int(e.control.value)
-        fan_value.value = f"Fan speed: {int(e.control.value)}"
-        controller.add_action("fan1", f"Set speed to {int(e.control.value)}")
-        update_summary()
-        page.update()
+    def select_tab(selected):
+        for tab in (overview_tab, statistics_tab, diagnostics_tab):
+            tab.style.color = "#66B2FF" if tab is selected else "#B0BEC5"
+        scheduler.mark(overview_tab, statistics_tab, diagnostics_tab)
     
     def show_overview(e):
-        controller.current_view = "overview"
-        overview_tab.style.color = "#66B2FF"
-        statistics_tab.style.color = "#B0BEC5"
+        nonlocal current_view
+        current_view = "overview"
+        select_tab(overview_tab)
         content_area.content = overview_content
         update_summary()
-        page.update()
+        scheduler.mark(content_area)
     
     def show_statistics(e):
-        controller.current_view = "statistics"
-        statistics_tab.style.color = "#66B2FF"
-        overview_tab.style.color = "#B0BEC5"
+        nonlocal current_view
+        current_view = "statistics"
+        select_tab(statistics_tab)
         
-        # Update action log table
-        log_rows = []
-        for action in controller.action_log[:10]:
-            log_rows.append(
-                ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(action["time"], size=12, color="#E0E0E0")),
-                    ft.DataCell(ft.Text(action["device"], size=12, color="#E0E0E0")),
-                    ft.DataCell(ft.Text(action["action"], size=12, color="#E0E0E0")),
-                    ft.DataCell(ft.Text(action["user"], size=12, color="#E0E0E0")),
-                ])
-            )
-        action_table.rows = log_rows
+        if statistics_content is None:
+            build_statistics()
+        refresh_action_table()
+        refresh_chart()
+        refresh_energy()
         
         content_area.content = statistics_content
-        page.update()
+        scheduler.mark(content_area)
     
     def show_device_details(device_id):
         def back_to_overview(e):
             show_overview(None)
         
         device = controller.devices[device_id]
-        recent_actions = [a for a in controller.action_log if a["device"] == device_id][:5]
+        with controller.lock:
+            recent_actions = controller.action_log.for_device(device_id, 5)
+        # Last ACTIVITY_DAYS days, newest first; actions only count once
+        # compacted out of the raw log, on-time as soon as an interval ends
+        now = time.time()
+        today = local_midnight(now)
+        # Hourly rollups summed per local day, as the daily ones end at UTC midnight
+        days = {}
+        for bucket, actions, on_seconds, low, high in controller.activity(
+                device_id, local_midnight(now, ACTIVITY_DAYS - 1), resolution=HOUR):
+            day = days.setdefault(date.fromtimestamp(bucket), [0, 0.0, None, None])
+            day[0] += actions
+            day[1] += on_seconds
+            if low is not None:
+                day[2] = low if day[2] is None else min(day[2], low)
+                day[3] = high if day[3] is None else max(day[3], high)
+        activity = sorted(days.items(), reverse=True)
+        energy_today = controller.energy.by_device(today, now)[device_id]
+        
+        def activity_line(day, values):
+            actions, on_seconds, low, high = values
+            parts = [f"{actions} actions"] if actions else []
+            if on_seconds:
+                parts.append(f"on {on_seconds / 3600:.1f} h")
+            if low is not None:
+                parts.append(f"set {low:g}–{high:g}")
+            return f"{day:%Y-%m-%d}: {', '.join(parts)}"
         
         details_view = ft.Container(
             content=ft.Column([
-                ft.Text(f"{device['name']} details", size=32, weight=ft.FontWeight.BOLD, color="#66B2FF"),
+                ft.Text(f"{device.name} details", size=32, weight=ft.FontWeight.BOLD, color="#66B2FF"),
                 ft.Container(height=20),
                 ft.Text(f"ID: {device_id}", size=16, color="#E0E0E0"),
-                ft.Text(f"Type: {device['type']}", size=16, color="#E0E0E0"),
-                ft.Text(f"State: {device['status'] if 'status' in device else device['value']}", size=16, color="#E0E0E0"),
-                ft.Text(f"Power: {device['power']}W", size=16, color="#E0E0E0"),
+                ft.Text(f"Type: {device.type.name.lower()}", size=16, color="#E0E0E0"),
+                ft.Text(f"Room: {device.room}", size=16, color="#E0E0E0"),
+                ft.Text(f"State: {device.status}", size=16, color="#E0E0E0"),
+                ft.Text(f"Power: {device.power}W", size=16, color="#E0E0E0"),
+                ft.Text(f"Energy today: {energy_today:.2f} kWh", size=16, color="#E0E0E0"),
                 ft.Container(height=40),
                 ft.Text("Recent actions", size=24, weight=ft.FontWeight.BOLD, color="#66B2FF"),
                 ft.Container(height=10),
                 ft.Column([
-                    ft.Text(f"{action['time']} - {action['action']} ({action['user']})", color="#B0BEC5")
+                    ft.Text(f"{format_time(action['timestamp'])} - {action['action']} ({action['user']})", color="#B0BEC5")
                     for action in recent_actions
                 ] if recent_actions else [ft.Text("No recent actions", color="#78909C")]),
+                *([
+                    ft.Container(height=20),
+                    ft.Text("Daily activity", size=24, weight=ft.FontWeight.BOLD, color="#66B2FF"),
+                    ft.Container(height=10),
+                    ft.Column([ft.Text(activity_line(*day), color="#B0BEC5") for day in activity]),
+                ] if activity else []),
                 ft.Container(height=20),
                 ft.ElevatedButton("Back to overview", on_click=back_to_overview, bgcolor="#66B2FF", color="#0A1929")
             ], scroll=ft.ScrollMode.AUTO),
@@ -216,7 +260,59 @@ def main(page: ft.Page):
         )
         
         content_area.content = details_view
-        page.update()
+        scheduler.mark(content_area)
+    
+    def show_diagnostics(e):
+        nonlocal current_view
+        current_view = "diagnostics"
+        select_tab(diagnostics_tab)
+        snapshot = instrumentation.snapshot(controller_gauges(controller, scheduler))
+        export_status = ft.Text(size=12, color="#B0BEC5")
+        
+        def export(e):
+            path = instrumentation.export(f"diagnostics-{int(time.time())}.json", controller_gauges(controller, scheduler))
+            export_status.value = f"Saved to {os.path.abspath(path)}"
+            scheduler.mark(export_status)
+        
+        def reset(e):
+            instrumentation.reset()
+            show_diagnostics(None)
+        
+        handler_rows = [
+            ft.Text(f"{name}: {h['count']} calls, p50 {h['p50_ms']:.2f} ms, p99 {h['p99_ms']:.2f} ms, "
+                    f"max {h['max_ms']:.2f} ms", size=14, color="#E0E0E0")
+            for name, h in snapshot["handlers"].items()
+        ]
+        gauge_rows = [
+            ft.Text(f"{name}: {value}", size=14, color="#E0E0E0")
+            for name, value in snapshot["gauges"].items()
+        ]
+        content_area.content = ft.Container(
+            content=ft.Column([
+                ft.Text("Handler latency", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
+                ft.Container(height=10),
+                *(handler_rows or [ft.Text("No handler calls recorded", color="#78909C")]),
+                ft.Container(height=30),
+                ft.Text("Counters", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
+                ft.Container(height=10),
+                *gauge_rows,
+                ft.Container(height=20),
+                ft.Row([
+                    ft.ElevatedButton("Export JSON", on_click=export, bgcolor="#66B2FF", color="#0A1929"),
+                    ft.TextButton("Refresh", on_click=show_diagnostics, style=ft.ButtonStyle(color="#66B2FF")),
+                    ft.TextButton("Reset", on_click=reset, style=ft.ButtonStyle(color="#66B2FF")),
+                ]),
+                export_status,
+            ], scroll=ft.ScrollMode.AUTO),
+            padding=20,
+            bgcolor="#0A1929",
+        )
+        scheduler.mark(content_area)
+    
+    show_overview = timed("show_overview", show_overview)
+    show_statistics = timed("show_statistics", show_statistics)
+    show_device_details = timed("show_device_details", show_device_details)
+    show_diagnostics = timed("show_diagnostics", show_diagnostics)
     
     # Header
     header = ft.Container(
@@ -237,6 +333,9 @@ def main(page: ft.Page):
                                          style=ft.ButtonStyle(color="#66B2FF")),
             statistics_tab := ft.TextButton("Statistics", on_click=show_statistics,
                                            style=ft.ButtonStyle(color="#B0BEC5")),
+            # Only shown when instrumentation is enabled
+            diagnostics_tab := ft.TextButton("Diagnostics", on_click=show_diagnostics, visible=instrumentation.enabled,
+                                            style=ft.ButtonStyle(color="#B0BEC5")),
         ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
         padding=ft.padding.only(left=20, right=20, top=20, bottom=10),
         bgcolor="#132F4C",
@@ -244,7 +343,7 @@ def main(page: ft.Page):
     
     # Summary cards
     summary_active = ft.Text("0", size=32, weight=ft.FontWeight.BOLD, color="#66B2FF")
-    summary_total = ft.Text("9", size=32, weight=ft.FontWeight.BOLD, color="#66B2FF")
+    summary_total = ft.Text(f"{len(controller.devices)}", size=32, weight=ft.FontWeight.BOLD, color="#66B2FF")
     summary_power = ft.Text("0W", size=32, weight=ft.FontWeight.BOLD, color="#66B2FF")
     
     summary_cards = ft.Row([
@@ -285,245 +384,280 @@ def main(page: ft.Page):
         ),
     ], wrap=True)
     
-    # Light cards
-    light1_status = ft.Text("Status: OFF", size=14, color="#E0E0E0")
-    light1_button = ft.TextButton("Turn ON", style=ft.ButtonStyle(color="#66B2FF"))
-    light1_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.LIGHTBULB_OUTLINE, color="#FFB74D"),
-                ft.Text("Living Room Light", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            light1_status,
-            ft.Text("Tap to switch the light.", size=12, color="#B0BEC5"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("light1"), style=ft.ButtonStyle(color="#66B2FF")),
-                ft.Container(expand=True),
-                light1_button,
-            ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
-    )
-    light1_button.on_click = toggle_light("light1", light1_status, light1_button, light1_card)
+    # Device cards, generated from the registry
+    def card_title(device):
+        icon, color, hint = CARD_STYLES[device.type]
+        return ft.Row([
+            ft.Icon(CARD_ICONS.get(device.id, icon), color=color),
+            ft.Text(device.name, size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
+        ])
     
-    light2_status = ft.Text("Status: OFF", size=14, color="#E0E0E0")
-    light2_button = ft.TextButton("Turn ON", style=ft.ButtonStyle(color="#66B2FF"))
-    light2_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.LIGHTBULB_OUTLINE, color="#FFB74D"),
-                ft.Text("Bedroom Light", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            light2_status,
-            ft.Text("Tap to switch the light.", size=12, color="#B0BEC5"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("light2"), style=ft.ButtonStyle(color="#66B2FF")),
-                ft.Container(expand=True),
-                light2_button,
-            ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
-    )
-    light2_button.on_click = toggle_light("light2", light2_status, light2_button, light2_card)
+    def details_button(device_id):
+        return ft.TextButton("Details", on_click=lambda e: show_device_details(device_id), style=ft.ButtonStyle(color="#66B2FF"))
     
-    light3_status = ft.Text("Status: OFF", size=14, color="#E0E0E0")
-    light3_button = ft.TextButton("Turn ON", style=ft.ButtonStyle(color="#66B2FF"))
-    light3_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.LIGHTBULB_OUTLINE, color="#FFB74D"),
-                ft.Text("Kitchen Light", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            light3_status,
-            ft.Text("Tap to switch the light.", size=12, color="#B0BEC5"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("light3"), style=ft.ButtonStyle(color="#66B2FF")),
-                ft.Container(expand=True),
-                light3_button,
+    def create_toggle_card(device):
+        hint = CARD_STYLES[device.type][2]
+        status_text = ft.Text(size=14, color="#E0E0E0")
+        button = ft.TextButton(style=ft.ButtonStyle(color="#66B2FF"))
+        card = ft.Container(
+            content=ft.Column([
+                card_title(device),
+                status_text,
+                ft.Text(hint, size=12, color="#B0BEC5"),
+                ft.Row([
+                    details_button(device.id),
+                    ft.Container(expand=True),
+                    button,
+                ]),
             ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
-    )
-    light3_button.on_click = toggle_light("light3", light3_status, light3_button, light3_card)
+            padding=20,
+            bgcolor="#132F4C",
+            border_radius=10,
+            width=280,
+        )
+        render_toggle(device, status_text, button, card)
+        button.on_click = toggle_device(device.id)
+        
+        def refresh(event):
+            render_toggle(device, status_text, button, card)
+            scheduler.mark(card)
+        
+        card_subscriptions.append(controller.events.subscribe(DeviceChanged, refresh, device.id))
+        return card
     
-    # Door cards
-    door1_status = ft.Text("Door: LOCKED", size=14, color="#E0E0E0")
-    door1_button = ft.TextButton("Unlock", style=ft.ButtonStyle(color="#66B2FF"))
-    door1_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.DOOR_FRONT_DOOR, color="#A1887F"),
-                ft.Text("Front Door", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            door1_status,
-            ft.Text("Tap to lock / unlock the door.", size=12, color="#B0BEC5"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("door1"), style=ft.ButtonStyle(color="#66B2FF")),
-                ft.Container(expand=True),
-                door1_button,
+    def create_slider_card(device):
+        icon, color, hint = CARD_STYLES[device.type]
+        minimum, maximum, divisions, cast, label, action = SLIDER_SETTINGS[device.type]
+        value_text = ft.Text(label.format(device.value), size=14, color="#E0E0E0")
+        
+        def preview(value):
+            # Label only; the device and the log change once the drag is committed
+            value_text.value = label.format(value)
+            scheduler.mark(value_text)
+        
+        def commit(value):
+            controller.add_action(device.id, action.format(value))
+            controller.set_value(device.id, value)
+            controller.command(device.id, "value", value)
+        
+        slider_input = SliderCoalescer(device.value, preview, timed("slider_commit", commit))
+        slider = ft.Slider(min=minimum, max=maximum, value=device.value, divisions=divisions,
+                           on_change=timed("slider_change", lambda e: slider_input.change(cast(e.control.value))),
+                           on_change_end=timed("slider_release", lambda e: slider_input.release(cast(e.control.value))),
+                           active_color=color)
+        
+        def refresh(event):
+            slider_input.sync(device.value)
+            slider.value = device.value
+            value_text.value = label.format(device.value)
+            scheduler.mark(slider, value_text)
+        
+        card_subscriptions.append(controller.events.subscribe(DeviceChanged, refresh, device.id))
+        return ft.Container(
+            content=ft.Column([
+                card_title(device),
+                value_text,
+                ft.Text(hint, size=12, color="#B0BEC5"),
+                slider,
+                ft.Row([
+                    details_button(device.id),
+                ]),
             ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
-    )
-    door1_button.on_click = toggle_door("door1", door1_status, door1_button, door1_card)
+            padding=20,
+            bgcolor="#132F4C",
+            border_radius=10,
+            width=280,
+        )
     
-    door2_status = ft.Text("Door: LOCKED", size=14, color="#E0E0E0")
-    door2_button = ft.TextButton("Unlock", style=ft.ButtonStyle(color="#66B2FF"))
-    door2_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.DOOR_BACK_DOOR, color="#A1887F"),
-                ft.Text("Back Door", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            door2_status,
-            ft.Text("Tap to lock / unlock the door.", size=12, color="#B0BEC5"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("door2"), style=ft.ButtonStyle(color="#66B2FF")),
-                ft.Container(expand=True),
-                door2_button,
-            ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
-    )
-    door2_button.on_click = toggle_door("door2", door2_status, door2_button, door2_card)
+    def create_card(device):
+        if device.type in SLIDER_TYPES:
+            return create_slider_card(device)
+        return create_toggle_card(device)
     
-    # TV card
-    tv_status = ft.Text("Status: OFF", size=14, color="#E0E0E0")
-    tv_button = ft.TextButton("Turn ON", on_click=toggle_tv, style=ft.ButtonStyle(color="#66B2FF"))
-    tv_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.TV, color="#64B5F6"),
-                ft.Text("Smart TV", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            tv_status,
-            ft.Text("Tap to switch the TV.", size=12, color="#B0BEC5"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("tv1"), style=ft.ButtonStyle(color="#66B2FF")),
-                ft.Container(expand=True),
-                tv_button,
-            ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
-    )
+    # Paginated device grid: only the cards on the current page exist, so build
+    # time and client memory depend on the page size, not on the device count
+    grid_filter = {"room": None, "type": None, "page": 0}
+    card_subscriptions = []  # DeviceChanged subscriptions of the cards on the current page
+    grid_body = ft.Column([])
+    grid_page_label = ft.Text(size=12, color="#B0BEC5")
     
-    # Camera card
-    camera_status = ft.Text("Status: OFF", size=14, color="#E0E0E0")
-    camera_button = ft.TextButton("Turn ON", on_click=toggle_camera, style=ft.ButtonStyle(color="#66B2FF"))
-    camera_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.CAMERA_ALT, color="#EF5350"),
-                ft.Text("Security Camera", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            camera_status,
-            ft.Text("Tap to switch the camera.", size=12, color="#B0BEC5"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("camera1"), style=ft.ButtonStyle(color="#66B2FF")),
-                ft.Container(expand=True),
-                camera_button,
-            ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
-    )
+    def render_grid():
+        ids = controller.devices.select(grid_filter["room"], grid_filter["type"])
+        pages = max(1, math.ceil(len(ids) / GRID_PAGE_SIZE))
+        grid_filter["page"] = min(grid_filter["page"], pages - 1)
+        start = grid_filter["page"] * GRID_PAGE_SIZE
+        
+        # Group the page's cards by room
+        for subscription in card_subscriptions:
+            controller.events.unsubscribe(subscription)
+        card_subscriptions.clear()
+        groups = {}
+        for device_id in ids[start:start + GRID_PAGE_SIZE]:
+            device = controller.devices[device_id]
+            groups.setdefault(device.room, []).append(create_card(device))
+        controls = []
+        for room, cards in groups.items():
+            controls += [
+                ft.Text(room, size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
+                ft.Container(height=10),
+                ft.Row(cards, wrap=True, spacing=15, run_spacing=10),
+                ft.Container(height=30),
+            ]
+        grid_body.controls = controls or [ft.Text("No devices match the filter", color="#78909C")]
+        
+        grid_page_label.value = f"Page {grid_filter['page'] + 1} of {pages} ({len(ids)} devices)"
+        grid_prev.disabled = grid_filter["page"] == 0
+        grid_next.disabled = grid_filter["page"] == pages - 1
+        scheduler.mark(grid_body, grid_page_label, grid_prev, grid_next)
     
-    # Thermostat card
-    temp_value = ft.Text("Set point: 22.0 °C", size=14, color="#E0E0E0")
-    thermostat_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.THERMOSTAT, color="#FF7043"),
-                ft.Text("Thermostat", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            temp_value,
-            ft.Text("Use slider to change temperature.", size=12, color="#B0BEC5"),
-            ft.Slider(min=15, max=30, value=22, divisions=30, on_change=change_temperature, active_color="#FF7043"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("thermostat1"), style=ft.ButtonStyle(color="#66B2FF")),
-            ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
-    )
+    def change_grid_filter(e):
+        grid_filter["room"] = room_filter.value or None
+        grid_filter["type"] = DeviceType[type_filter.value] if type_filter.value else None
+        grid_filter["page"] = 0
+        render_grid()
     
-    # Fan card
-    fan_value = ft.Text("Fan speed: 0", size=14, color="#E0E0E0")
-    fan_card = ft.Container(
-        content=ft.Column([
-            ft.Row([
-                ft.Icon(ft.Icons.AIR, color="#4DD0E1"),
-                ft.Text("Ceiling Fan", size=18, weight=ft.FontWeight.BOLD, color="#E0E0E0"),
-            ]),
-            fan_value,
-            ft.Text("0 = OFF, 3 = MAX.", size=12, color="#B0BEC5"),
-            ft.Slider(min=0, max=3, value=0, divisions=3, on_change=change_fan_speed, active_color="#4DD0E1"),
-            ft.Row([
-                ft.TextButton("Details", on_click=lambda e: show_device_details("fan1"), style=ft.ButtonStyle(color="#66B2FF")),
-            ]),
-        ]),
-        padding=20,
-        bgcolor="#132F4C",
-        border_radius=10,
-        width=280,
+    def change_grid_page(step):
+        def handler(e):
+            grid_filter["page"] += step
+            render_grid()
+        return timed("grid_page", handler)
+    
+    
+    def activate_scene(name):
+        def handler(e):
+            controller.apply_scene(name)
+        return timed("scene", handler)
+    
+    scene_bar = ft.Row([
+        ft.Text("Scenes", size=14, color="#B0BEC5"),
+    ] + [
+        ft.TextButton(name, on_click=activate_scene(name), style=ft.ButtonStyle(color="#66B2FF"))
+        for name in SCENES
+    ], wrap=True)
+    
+    room_filter = ft.Dropdown(
+        label="Room",
+        value="",
+        options=[ft.dropdown.Option("", "All rooms")] + [ft.dropdown.Option(room) for room in controller.devices.by_room],
+        on_change=timed("grid_filter", change_grid_filter),
+        width=220,
+    )
+    type_filter = ft.Dropdown(
+        label="Type",
+        value="",
+        options=[ft.dropdown.Option("", "All types")] + [
+            ft.dropdown.Option(t.name, t.name.capitalize()) for t in controller.devices.by_type
+        ],
+        on_change=timed("grid_filter", change_grid_filter),
+        width=180,
     )
+    grid_prev = ft.TextButton("Previous", on_click=change_grid_page(-1), style=ft.ButtonStyle(color="#66B2FF"))
+    grid_next = ft.TextButton("Next", on_click=change_grid_page(1), style=ft.ButtonStyle(color="#66B2FF"))
+    grid_controls = ft.Row([
+        room_filter,
+        type_filter,
+        ft.Container(expand=True),
+        grid_prev,
+        grid_page_label,
+        grid_next,
+    ], wrap=True)
+    render_grid()
     
     # Overview content
     overview_content = ft.Container(
         content=ft.Column([
             summary_cards,
             ft.Container(height=20),
-            ft.Text("On/Off devices", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
-            ft.Container(height=10),
-            ft.Row([light1_card, ft.Container(width=15), light2_card, ft.Container(width=15), light3_card], wrap=True),
-            ft.Container(height=10),
-            ft.Row([door1_card, ft.Container(width=15), door2_card, ft.Container(width=15), tv_card], wrap=True),
+            scene_bar,
             ft.Container(height=10),
-            ft.Row([camera_card], wrap=True),
-            ft.Container(height=30),
-            ft.Text("Slider controlled devices", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
-            ft.Container(height=10),
-            ft.Row([thermostat_card, ft.Container(width=15), fan_card], wrap=True),
+            grid_controls,
+            ft.Container(height=20),
+            grid_body,
         ], scroll=ft.ScrollMode.AUTO),
         padding=20,
         bgcolor="#0A1929",
     )
     
-    # Create power consumption line chart
-    def create_line_chart():
-        max_power = max(controller.power_data)
-        
-        # Create line points
-        points = []
-        for i, value in enumerate(controller.power_data):
-            x = 50 + (i * 26)
-            y = 240 - (value / max_power * 200)
-            points.append(f"{x},{y}")
-        
-        line_path = " ".join(points)
+    # Live power chart: CHART_SLOTS bars are created once; a refresh downsamples
+    # the window to that many points and only touches bars whose height changed
+    chart_bars = []
+    chart_scale = []
+    
+    def refresh_chart(*args):
+        if not chart_bars:
+            return  # Statistics has not been opened yet
+        # Per-minute averages for the window; minutes without samples show as 0
+        now = time.time()
+        power_data = [value or 0 for value in controller.power_series.window(now - CHART_WINDOW, now, MINUTE)]
+        power_data = lttb(power_data, CHART_SLOTS)
+        max_power = max(max(power_data, default=0), 1)
         
+        changed = []
+        for i, bar in enumerate(chart_bars):
+            height = max(2, (power_data[i] / max_power) * 200) if i < len(power_data) else 0
+            if bar.height != height:
+                bar.height = height
+                changed.append(bar)
+        for text, share in zip(chart_scale, (1, 0.75, 0.5, 0.25)):
+            label = f"{int(max_power * share)}W"
+            if text.value != label:
+                text.value = label
+                changed.append(text)
+        if changed:
+            scheduler.mark(*changed)
+    
+    energy_lines = []  # home total, then the rooms using the most today
+    
+    def refresh_energy():
+        if not energy_lines:
+            return  # Statistics has not been opened yet
+        now = time.time()
+        today = local_midnight(now)
+        rooms = controller.energy.by_room(today, now)
+        week = controller.energy.total(local_midnight(now, 6), now)
+        values = [f"Today: {sum(rooms.values()):.2f} kWh, last 7 days: {week:.2f} kWh"]
+        top = sorted(rooms.items(), key=lambda item: item[1], reverse=True)[:ENERGY_ROOMS]
+        values += [f"{room}: {kwh:.2f} kWh" for room, kwh in top if kwh > 0]
+        values += [""] * (len(energy_lines) - len(values))
+        changed = []
+        for text, value in zip(energy_lines, values):
+            if text.value != value:
+                text.value = value
+                changed.append(text)
+        if changed:
+            scheduler.mark(*changed)
+    
+    # Changes from any session, rule or device reach this session through
+    # controller.events: cards subscribe to their own device only, so a change
+    # refreshes just the cards showing it; a scene's changes and the summary
+    # land in the same scheduler frame
+    def refresh_statistics(event):
+        if current_view == "statistics":
+            if isinstance(event, PowerSampled):
+                refresh_chart()
+                refresh_energy()
+            else:
+                refresh_action_table()
+    
+    subscriptions = [
+        controller.events.subscribe(TotalsChanged, update_summary),
+        controller.events.subscribe(ActionLogged, refresh_statistics),
+        controller.events.subscribe(PowerSampled, refresh_statistics),
+    ]
+    
+    def session_closed(e):
+        for subscription in subscriptions + card_subscriptions:
+            controller.events.unsubscribe(subscription)
+    
+    page.on_close = session_closed
+    
+    def create_line_chart():
+        chart_bars[:] = [
+            ft.Container(height=0, width=2, bgcolor="#66B2FF", border_radius=1)
+            for _ in range(CHART_SLOTS)
+        ]
+        chart_scale[:] = [ft.Text("0W", size=10, color="#B0BEC5") for _ in range(4)]
+        refresh_chart()
         chart_container = ft.Container(
             content=ft.Column([
                 ft.Container(
@@ -543,13 +677,13 @@ def main(page: ft.Page):
                         # Y-axis labels
                         ft.Row([
                             ft.Column([
-                                ft.Text(f"{int(max_power)}W", size=10, color="#B0BEC5"),
+                                chart_scale[0],
                                 ft.Container(height=35),
-                                ft.Text(f"{int(max_power*0.75)}W", size=10, color="#B0BEC5"),
+                                chart_scale[1],
                                 ft.Container(height=35),
-                                ft.Text(f"{int(max_power*0.5)}W", size=10, color="#B0BEC5"),
+                                chart_scale[2],
                                 ft.Container(height=35),
-                                ft.Text(f"{int(max_power*0.25)}W", size=10, color="#B0BEC5"),
+                                chart_scale[3],
                                 ft.Container(height=35),
                                 ft.Text("0W", size=10, color="#B0BEC5"),
                             ]),
@@ -560,18 +694,13 @@ def main(page: ft.Page):
                                     ft.Container(
                                         content=ft.Column([
                                             ft.Container(expand=True),
-                                            ft.Container(
-                                                height=max(2, (value / max_power) * 200),
-                                                width=2,
-                                                bgcolor="#66B2FF",
-                                                border_radius=1,
-                                            ),
+                                            bar,
                                         ]),
                                         expand=True,
                                     )
-                                    for value in controller.power_data
-                                ], spacing=24),
-                                width=630,
+                                    for bar in chart_bars
+                                ], spacing=1),
+                                width=CHART_WIDTH,
                                 height=240,
                             ),
                         ]),
@@ -582,15 +711,12 @@ def main(page: ft.Page):
                 ft.Container(height=10),
                 ft.Row([
                     ft.Container(width=40),
-                    ft.Text("0h", size=10, color="#B0BEC5"),
-                    ft.Container(expand=True),
-                    ft.Text("6h", size=10, color="#B0BEC5"),
-                    ft.Container(expand=True),
-                    ft.Text("12h", size=10, color="#B0BEC5"),
-                    ft.Container(expand=True),
-                    ft.Text("18h", size=10, color="#B0BEC5"),
-                    ft.Container(expand=True),
-                    ft.Text("24h", size=10, color="#B0BEC5"),
+                    # Quarters of the chart window, oldest first
+                    *[control for quarter in (4, 3, 2, 1) for control in (
+                        ft.Text(f"-{duration_label(CHART_WINDOW * quarter / 4)}", size=10, color="#B0BEC5"),
+                        ft.Container(expand=True),
+                    )],
+                    ft.Text("now", size=10, color="#B0BEC5"),
                 ], width=700),
             ]),
             padding=20,
@@ -599,38 +725,119 @@ def main(page: ft.Page):
         )
         return chart_container
     
-    # Statistics content
-    action_table = ft.DataTable(
-        columns=[
-            ft.DataColumn(ft.Text("Time", weight=ft.FontWeight.BOLD, color="#66B2FF")),
-            ft.DataColumn(ft.Text("Device", weight=ft.FontWeight.BOLD, color="#66B2FF")),
-            ft.DataColumn(ft.Text("Action", weight=ft.FontWeight.BOLD, color="#66B2FF")),
-            ft.DataColumn(ft.Text("User", weight=ft.FontWeight.BOLD, color="#66B2FF")),
-        ],
-        rows=[],
-        border=ft.border.all(1, "#1E3A5F"),
-        border_radius=10,
-        heading_row_color="#1E3A5F",
-    )
+    # Statistics content, built on the first visit and reused afterwards
+    action_table = None
+    log_pager = None  # Newer / Older buttons
+    statistics_content = None
+    shown_log_page = None  # (cursor, action_log.total) of the rows shown; total only matters on the first page
+    log_cursors = [None]  # cursor of every page from the newest to the one shown
+    older_cursor = None
+    FIRST_PAGE_END = object()  # older_cursor of the first page, resolved on Older
     
-    statistics_content = ft.Container(
-        content=ft.Column([
-            ft.Text("Power consumption (simulated)", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
-            ft.Container(height=10),
-            create_line_chart(),
-            ft.Container(height=30),
-            ft.Text("Action log", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
-            ft.Container(height=10),
-            ft.Container(
-                content=action_table,
-                bgcolor="#132F4C",
-                padding=10,
-                border_radius=10,
-            ),
-        ], scroll=ft.ScrollMode.AUTO),
-        padding=20,
-        bgcolor="#0A1929",
-    )
+    def build_statistics():
+        nonlocal action_table, log_pager, statistics_content
+        energy_lines[:] = [ft.Text("", size=14, color="#E0E0E0") for _ in range(ENERGY_ROOMS + 1)]
+        action_table = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Time", weight=ft.FontWeight.BOLD, color="#66B2FF")),
+                ft.DataColumn(ft.Text("Device", weight=ft.FontWeight.BOLD, color="#66B2FF")),
+                ft.DataColumn(ft.Text("Action", weight=ft.FontWeight.BOLD, color="#66B2FF")),
+                ft.DataColumn(ft.Text("User", weight=ft.FontWeight.BOLD, color="#66B2FF")),
+            ],
+            rows=[],
+            border=ft.border.all(1, "#1E3A5F"),
+            border_radius=10,
+            heading_row_color="#1E3A5F",
+        )
+        log_pager = ft.Row([
+            ft.TextButton("Newer", on_click=change_log_page(-1), disabled=True, style=ft.ButtonStyle(color="#66B2FF")),
+            ft.TextButton("Older", on_click=change_log_page(1), disabled=True, style=ft.ButtonStyle(color="#66B2FF")),
+        ])
+        
+        statistics_content = ft.Container(
+            content=ft.Column([
+                ft.Text(f"Power consumption (last {duration_label(CHART_WINDOW)})", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
+                ft.Container(height=10),
+                create_line_chart(),
+                ft.Container(height=30),
+                ft.Text("Energy", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
+                ft.Container(height=10),
+                ft.Container(
+                    content=ft.Column(energy_lines),
+                    bgcolor="#132F4C",
+                    padding=10,
+                    border_radius=10,
+                ),
+                ft.Container(height=30),
+                ft.Text("Action log", size=20, weight=ft.FontWeight.BOLD, color="#66B2FF"),
+                ft.Container(height=10),
+                ft.Container(
+                    content=action_table,
+                    bgcolor="#132F4C",
+                    padding=10,
+                    border_radius=10,
+                ),
+                log_pager,
+            ], scroll=ft.ScrollMode.AUTO),
+            padding=20,
+            bgcolor="#0A1929",
+        )
+    
+    def refresh_action_table():
+        # Reuse the DataRows and only rewrite cells whose text changed. Older
+        # pages never change, so only the first one is re-read after new actions.
+        nonlocal shown_log_page, older_cursor
+        cursor = log_cursors[-1]
+        key = (cursor, controller.action_log.total if cursor is None else None)
+        if key == shown_log_page:
+            return
+        shown_log_page = key
+        if cursor is None:
+            # The newest entries are always in the buffer. Reading them there
+            # keeps a click in any session from flushing the log store while it
+            # holds the controller lock; the store cursor of the next page is
+            # only looked up when Older is clicked.
+            with controller.lock:
+                entries = controller.action_log.latest(LOG_PAGE_SIZE + 1)
+                more = len(entries) > LOG_PAGE_SIZE or not controller.action_log.complete
+            entries = entries[:LOG_PAGE_SIZE]
+            older_cursor = FIRST_PAGE_END if more else None
+        else:
+            entries, older_cursor = controller.history.page(LOG_PAGE_SIZE, cursor)
+        changed = []
+        if len(action_table.rows) != len(entries):
+            while len(action_table.rows) < len(entries):
+                action_table.rows.append(ft.DataRow(cells=[
+                    ft.DataCell(ft.Text("", size=12, color="#E0E0E0")) for _ in range(4)
+                ]))
+            del action_table.rows[len(entries):]
+            changed.append(action_table)
+        pager = log_pager.controls
+        if (pager[0].disabled, pager[1].disabled) != (cursor is None, older_cursor is None):
+            pager[0].disabled = cursor is None
+            pager[1].disabled = older_cursor is None
+            changed.append(log_pager)
+        for row, action in zip(action_table.rows, entries):
+            for cell, value in zip(row.cells, (format_time(action["timestamp"]), action["device"], action["action"], action["user"])):
+                if cell.content.value != value:
+                    cell.content.value = value
+                    changed.append(cell.content)
+        if changed:
+            scheduler.mark(*changed)
+    
+    def change_log_page(step):
+        def handler(e):
+            if step > 0:
+                cursor = older_cursor
+                if cursor is FIRST_PAGE_END:
+                    cursor = controller.history.page(LOG_PAGE_SIZE)[1]
+                    if cursor is None:
+                        return
+                log_cursors.append(cursor)
+            else:
+                log_cursors.pop()
+            refresh_action_table()
+        return timed("log_page", handler)
     
     # Main content area
     content_area = ft.Container(
@@ -649,4 +856,5 @@ def main(page: ft.Page):
     
     update_summary()
 
-ft.app(target=main)
\ No newline at end of file
+if __name__ == "__main__":
+    ft.app(target=main)
\ No newline at end of file
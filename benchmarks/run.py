@@ -0,0 +1,239 @@
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from smart_home import DAY, DeviceChanged, SmartHomeController, generate_building, measure_device_memory, save_snapshot
+from smart_home.energy import EnergyMeter
+
+class StubPage:
+    # Stands in for ft.Page: keeps the added controls and counts updates
+    def __init__(self):
+        self.title = None
+        self.padding = None
+        self.bgcolor = None
+        self.controls = []
+        self.updates = 0
+
+    def add(self, *controls):
+        self.controls.extend(controls)
+
+    def update(self, *controls):
+        self.updates += 1
+
+def measure(fn, number=1, repeat=5):
+    # Best of `repeat` runs of `number` calls, in seconds per call
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def result(seconds, **params):
+    return {"seconds": seconds, "per_second": 1 / seconds if seconds else None, **params}
+
+def bench_add_action(sizes):
+    # Cost of one add_action once the log already holds `size` entries
+    results = {}
+    for size in sizes:
+        controller = SmartHomeController(log_capacity=max(sizes))
+        for i in range(size):
+            controller.add_action(f"light{i % 100}", "Turn ON")
+        results[f"add_action[log={size}]"] = result(
+            measure(lambda: controller.add_action("light1", "Turn ON"), number=10000), log_size=size)
+    return results
+
+def bench_power(device_counts):
+    results = {}
+    for count in device_counts:
+        controller = SmartHomeController(devices=generate_building(max(1, count // 5)))
+        results[f"get_current_power[devices={count}]"] = result(
+            measure(controller.get_current_power, number=10000), devices=count)
+        # update_summary reads the running totals; the full recompute is what it used to cost
+        results[f"summary_counts[devices={count}]"] = result(
+            measure(lambda: (controller.active_devices, len(controller.devices)), number=10000), devices=count)
+        results[f"recompute_totals[devices={count}]"] = result(
+            measure(controller.recompute_totals, number=1 if count > 10000 else 10), devices=count)
+        device_id = next(iter(controller.devices)).id
+        results[f"toggle[devices={count}]"] = result(
+            measure(lambda: controller.toggle(device_id), number=10000), devices=count)
+    return results
+
+def bench_device_details(log_size, devices=1000):
+    controller = SmartHomeController(log_capacity=log_size)
+    for i in range(log_size):
+        controller.add_action(f"light{i % devices}", "Turn ON")
+    return {
+        f"device_details_lookup[log={log_size}]": result(
+            measure(lambda: controller.action_log.for_device("light7", 5), number=10000), log_size=log_size),
+        f"latest_actions[log={log_size}]": result(
+            measure(lambda: controller.action_log.latest(10), number=10000), log_size=log_size),
+    }
+
+def bench_memory(count):
+    # Bytes per device, not a timing, so --compare skips it
+    memory = measure_device_memory(count)
+    return {f"device_memory[devices={count}]": {
+        "dict_bytes": memory["dict"], "slots_bytes": memory["slots"], "devices": count}}
+
+def bench_events(device_count):
+    # toggle with one DeviceChanged subscriber per device, as if every card
+    # were open: only the toggled device's subscriber should run
+    controller = SmartHomeController(devices=generate_building(device_count // 5))
+    for device in controller.devices:
+        controller.events.subscribe(DeviceChanged, lambda event: None, device.id)
+    device_id = next(iter(controller.devices)).id
+    return {f"toggle_subscribed[devices={device_count}]": result(
+        measure(lambda: controller.toggle(device_id), number=10000), devices=device_count)}
+
+def bench_log_store(log_size):
+    # add_action with the on-disk log, and paged history queries once it holds `log_size` entries
+    with tempfile.TemporaryDirectory() as directory:
+        controller = SmartHomeController(log_path=os.path.join(directory, "actions.db"))
+        results = {f"add_action_persistent[log={log_size}]": result(
+            measure(lambda: controller.add_action("light1", "Turn ON"), number=log_size // 5), log_size=log_size)}
+        for i in range(log_size):
+            controller.add_action(f"light{i % 1000}", "Turn ON")
+        history = controller.history
+        results[f"history_first_page[log={log_size}]"] = result(
+            measure(lambda: history.page(10), number=1000), log_size=log_size)
+        results[f"history_device_page[log={log_size}]"] = result(
+            measure(lambda: history.page(10, log_size // 2, device="light7"), number=1000), log_size=log_size)
+        controller.close()
+    return results
+
+def bench_snapshot(device_count):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "snapshot.bin")
+        controller = SmartHomeController(devices=generate_building(device_count // 5))
+        results = {f"snapshot_save[devices={device_count}]": result(
+            measure(lambda: save_snapshot(controller, path), repeat=3), devices=device_count)}
+        results[f"snapshot_restore[devices={device_count}]"] = result(
+            measure(lambda: SmartHomeController(snapshot_path=path), repeat=3), devices=device_count)
+    return results
+
+def bench_energy(device_count, changes):
+    # kWh reports over 90 days of `changes` power changes spread over the devices
+    controller = SmartHomeController(devices=generate_building(device_count // 5))
+    meter = EnergyMeter(controller)
+    start = time.time() - 90 * DAY
+    meter.start(start)
+    rng = random.Random(1)
+    device_ids = meter.device_ids
+    for i in range(changes):
+        meter.record(start + i * 90 * DAY / changes, rng.choice(device_ids), rng.choice((0, 40, 150, 200)))
+    today = time.time() // DAY * DAY
+    params = {"devices": device_count, "changes": changes}
+    suffix = f"[devices={device_count},changes={changes}]"
+    return {
+        f"energy_daily_90d{suffix}": result(measure(lambda: meter.table(start), repeat=3), **params),
+        f"energy_rooms_today{suffix}": result(measure(lambda: meter.by_room(today), number=100), **params),
+    }
+
+def find_button(control, text):
+    if getattr(control, "text", None) == text and getattr(control, "on_click", None) is not None:
+        return control
+    children = getattr(control, "controls", None) or []
+    content = getattr(control, "content", None)
+    if content is not None:
+        children = [*children, content]
+    for child in children:
+        found = find_button(child, text)
+        if found is not None:
+            return found
+    return None
+
+def bench_ui(rooms_options):
+    try:
+        import Individual_study_final as app
+    except ImportError as exc:
+        return {"ui": {"skipped": f"Flet is not installed ({exc})"}}
+
+    results = {}
+    for rooms in rooms_options:
+        app.BUILDING_ROOMS = rooms
+        app.close_home()  # the shared controller is built by the first session
+        devices = rooms * 5 if rooms else 9
+        results[f"first_session[devices={devices}]"] = result(measure(lambda: app.main(StubPage()), repeat=1),
+                                                              devices=devices)
+        results[f"main_build[devices={devices}]"] = result(
+            measure(lambda: app.main(StubPage()), repeat=3), devices=devices)
+
+        # First visit builds the chart and the table; later visits only refresh them
+        first = float("inf")
+        for _ in range(3):
+            page = StubPage()
+            app.main(page)
+            statistics = find_button(page.controls[0], "Statistics")
+            start = time.perf_counter()
+            statistics.on_click(None)
+            first = min(first, time.perf_counter() - start)
+        results[f"show_statistics_first[devices={devices}]"] = result(first, devices=devices)
+        statistics.on_click(None)
+        results[f"show_statistics_repeat[devices={devices}]"] = result(
+            measure(lambda: statistics.on_click(None), number=100), devices=devices)
+    app.BUILDING_ROOMS = 0
+    app.close_home()  # stops the last home's sampler and retention threads
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(quick=False):
+    results = {}
+    results.update(bench_add_action([1000, 10000] if quick else [1000, 10000, 100000]))
+    results.update(bench_power([10, 1000] if quick else [10, 1000, 100000]))
+    results.update(bench_device_details(10000 if quick else 100000))
+    results.update(bench_memory(10000 if quick else 100000))
+    results.update(bench_events(1000 if quick else 100000))
+    results.update(bench_log_store(10000 if quick else 100000))
+    results.update(bench_snapshot(1000 if quick else 10000))
+    results.update(bench_energy(1000, 100000) if quick else bench_energy(5000, 1000000))
+    results.update(bench_ui([0] if quick else [0, 2000]))
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+
+def compare(baseline, current):
+    # Ratio current/baseline per benchmark; above 1 means slower
+    rows = []
+    for name, entry in current["results"].items():
+        before = baseline["results"].get(name, {}).get("seconds")
+        if before and entry.get("seconds"):
+            rows.append((name, before, entry["seconds"], entry["seconds"] / before))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the controller and UI hot paths")
+    parser.add_argument("--output", default="-", help="JSON results file, - for stdout")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast check")
+    args = parser.parse_args()
+
+    report = run(args.quick)
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for name, before, after, ratio in compare(baseline, report):
+            print(f"{name:50} {before * 1e6:12.2f}us {after * 1e6:12.2f}us {ratio:6.2f}x", file=sys.stderr)
@@ -0,0 +1,28 @@
+# Headless smart home core: devices, controller and simulator. Nothing here
+# imports Flet, so workers, tests and benchmarks can use it without a UI.
+# smart_home.drivers (asyncio), smart_home.energy and smart_home.thermal
+# (NumPy) are imported on their own, so importing the package stays cheap.
+from smart_home.action_log import ACTION_LOG_CAPACITY, ActionLog, format_time, parse_action
+from smart_home.controller import SmartHomeController
+from smart_home.devices import (
+    DEFAULT_DEVICES,
+    SLIDER_TYPES,
+    TOGGLES,
+    Device,
+    DeviceRegistry,
+    DeviceType,
+    State,
+    measure_device_memory,
+)
+from smart_home.diagnostics import Histogram, Instrumentation, controller_gauges
+from smart_home.downsample import lttb, min_max
+from smart_home.events import ActionLogged, DeviceChanged, EventBus, PowerSampled, TotalsChanged
+from smart_home.log_store import LogStore
+from smart_home.power_series import DAY, HOUR, MINUTE, WEEK, PowerSampler, PowerSeries, RollingSeries
+from smart_home.retention import ActivityRollups, Retention
+from smart_home.rules import POWER, Rule, RuleEngine, above, below, default_rules, equals
+from smart_home.scenes import SCENES, scene_changes
+from smart_home.scheduling import RenderScheduler, SliderCoalescer
+from smart_home.simulator import generate_building
+from smart_home.snapshot import SnapshotWriter, load_snapshot, save_snapshot
+from smart_home.stats import percentile
@@ -0,0 +1,147 @@
+from bisect import bisect_left
+from collections import deque
+from datetime import date, datetime
+from itertools import dropwhile, islice, takewhile
+import re
+
+from smart_home.devices import TOGGLES
+
+ACTION_LOG_CAPACITY = 5000
+
+TOGGLE_ACTIONS = {action: state for state, action in TOGGLES.values()}  # e.g. "Unlock" -> UNLOCKED
+VALUE_ACTION = re.compile(r"Set (speed )?to (-?[\d.]+)")
+
+def parse_action(action):
+    # What a device action record did: ("state", State), ("speed", int) for
+    # fans or ("setpoint", float) for thermostats. None for other records
+    # (scenes, rules, failures), which do not name a single device change.
+    if action in TOGGLE_ACTIONS:
+        return "state", TOGGLE_ACTIONS[action]
+    match = VALUE_ACTION.match(action)
+    if match is None:
+        return None
+    if match.group(1):
+        return "speed", int(float(match.group(2)))
+    return "setpoint", float(match.group(2))
+
+def format_time(timestamp):
+    # Entries keep epoch seconds; the time of day for today, date and time otherwise
+    moment = datetime.fromtimestamp(timestamp)
+    return moment.strftime("%H:%M:%S" if moment.date() == date.today() else "%Y-%m-%d %H:%M:%S")
+
+class ActionLog:
+    # Fixed-capacity ring buffer: O(1) append, newest-first iteration and a
+    # per-device index so "last N for device X" costs O(N), not O(log size).
+    # Entries are appended in time order, so time ranges are found by bisection.
+    def __init__(self, capacity=ACTION_LOG_CAPACITY):
+        self.capacity = capacity
+        self._entries = [None] * capacity
+        self._next = 0  # sequence number of the next entry
+        self._oldest = 0  # sequence number of the oldest entry kept
+        self._by_device = {}  # device id -> deque of sequence numbers, oldest first
+        self.complete = True  # False when seeded with only the newest part of a longer history
+
+    def append(self, entry):
+        seq = self._next
+        if seq - self._oldest == self.capacity:
+            self._drop(self._oldest)
+            self._oldest += 1
+        self._entries[seq % self.capacity] = entry
+        self._by_device.setdefault(entry["device"], deque()).append(seq)
+        self._next = seq + 1
+
+    def _drop(self, seq):
+        # The dropped entry is the oldest overall, so it is also the oldest for its device
+        slot = seq % self.capacity
+        device = self._entries[slot]["device"]
+        index = self._by_device[device]
+        index.popleft()
+        if not index:
+            del self._by_device[device]
+        self._entries[slot] = None
+
+    def drop_through(self, seq):
+        # Drops every entry up to sequence number `seq`, e.g. once retention
+        # has compacted them into rollups
+        while self._oldest <= seq and self._oldest < self._next:
+            self._drop(self._oldest)
+            self._oldest += 1
+
+    def __len__(self):
+        return self._next - self._oldest
+
+    @property
+    def total(self):
+        # Entries ever appended, including evicted ones; changes on every append
+        return self._next
+
+    def __iter__(self):
+        # Newest first
+        for seq in range(self._next - 1, self._next - 1 - len(self), -1):
+            yield self._entries[seq % self.capacity]
+
+    def latest(self, n):
+        return list(islice(self, n))
+
+    def for_device(self, device_id, n):
+        index = self._by_device.get(device_id, ())
+        return [self._entries[seq % self.capacity] for seq in islice(reversed(index), n)]
+
+    def _first_at(self, timestamp):
+        # Sequence number of the first entry logged at or after timestamp
+        oldest = self._next - len(self)
+        return oldest + bisect_left(range(oldest, self._next), timestamp,
+                                    key=lambda seq: self._entries[seq % self.capacity]["timestamp"])
+
+    def covers(self, start):
+        # True if no entry logged since `start` has been evicted or dropped
+        if self._oldest == 0 and self.complete:
+            return True
+        return self._oldest < self._next and self._entries[self._oldest % self.capacity]["timestamp"] <= start
+
+    def between(self, start, end=None):
+        # Entries logged in [start, end), newest first
+        last = self._next if end is None else self._first_at(end)
+        return [self._entries[seq % self.capacity] for seq in range(last - 1, self._first_at(start) - 1, -1)]
+
+    def scan(self, after=None, chunk_size=10000, device=None, user=None, start=None, end=None):
+        # Same chunks as LogStore.scan, with sequence numbers as ids
+        first = self._next - len(self) if start is None else self._first_at(start)
+        if after is not None:
+            first = max(first, after + 1)
+        last = self._next if end is None else self._first_at(end)
+        chunk = []
+        for seq in range(first, last):
+            entry = self._entries[seq % self.capacity]
+            if (device is None or entry["device"] == device) and (user is None or entry["user"] == user):
+                chunk.append((seq, entry["timestamp"], entry["device"], entry["action"], entry["user"]))
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    def page(self, limit, before=None, device=None, user=None, start=None, end=None):
+        # Same paging as LogStore.page, over the entries still in the buffer;
+        # the cursor is a sequence number
+        if limit <= 0:
+            raise ValueError(f"page limit must be positive, got {limit}")
+        oldest = self._next - len(self) if start is None else self._first_at(start)
+        newest = self._next if before is None else min(before, self._next)
+        if end is not None:
+            newest = min(newest, self._first_at(end))
+        if device is not None:
+            sequences = takewhile(lambda seq: seq >= oldest, dropwhile(
+                lambda seq: seq >= newest, reversed(self._by_device.get(device, ()))))
+        else:
+            sequences = range(newest - 1, oldest - 1, -1)
+        entries = []
+        for seq in sequences:
+            entry = self._entries[seq % self.capacity]
+            if user is not None and entry["user"] != user:
+                continue
+            if len(entries) == limit:
+                return entries, last
+            entries.append(entry)
+            last = seq
+        return entries, None
@@ -0,0 +1,245 @@
+import threading
+import time
+
+from smart_home.action_log import ACTION_LOG_CAPACITY, ActionLog
+from smart_home.devices import DEFAULT_DEVICES, TOGGLES, Device, DeviceRegistry
+from smart_home.events import ActionLogged, DeviceChanged, EventBus, TotalsChanged
+from smart_home.log_store import LogStore
+from smart_home.power_series import DAY, PowerSeries
+from smart_home.retention import ActivityRollups
+from smart_home.rules import POWER, RuleEngine
+from smart_home.scenes import scene_changes
+from smart_home.snapshot import load_snapshot
+
+class SmartHomeController:
+    def __init__(self, log_capacity=ACTION_LOG_CAPACITY, devices=None, log_path=None, snapshot_path=None):
+        # Changes and log appends hold this lock (re-entrant, for rule
+        # cascades), so background readers such as SnapshotWriter see one
+        # consistent state
+        self.lock = threading.RLock()
+        # A valid snapshot replaces the given devices with the saved ones
+        snapshot = None if snapshot_path is None else load_snapshot(snapshot_path)
+        if snapshot is not None:
+            devices = snapshot["devices"]
+        elif devices is None:
+            devices = [Device(*spec) for spec in DEFAULT_DEVICES]
+        self.devices = DeviceRegistry(devices)
+        self.action_log = ActionLog(log_capacity)
+        # With a log_path every action is also kept on disk, and the buffer
+        # starts with the newest stored entries
+        self.log_store = None
+        if log_path is not None:
+            self.log_store = LogStore(log_path)
+            for entry in reversed(self.log_store.latest(log_capacity)):
+                self.action_log.append(entry)
+            # Older stored entries are not in the buffer, so coverage is decided by timestamp
+            self.action_log.complete = len(self.action_log) == 0
+        elif snapshot is not None:
+            for entry in reversed(snapshot["log"][:log_capacity]):
+                self.action_log.append(entry)
+        self.history = self.action_log if self.log_store is None else self.log_store  # answers paged history queries
+        self.rollups = ActivityRollups()  # activity of entries compacted out of the raw log by Retention
+        if self.log_store is not None:
+            self.rollups.load(*self.log_store.load_rollups())
+        elif snapshot is not None and snapshot["rollups"] is not None:
+            self.rollups.load(*snapshot["rollups"])
+        self._last_logged = max((entry["timestamp"] for entry in self.action_log.latest(1)), default=0.0)
+        self.power_series = PowerSeries()
+        if snapshot is not None:
+            for width, (size, *arrays) in snapshot["power"].items():
+                series = self.power_series.resolutions.get(width)
+                if series is not None and series.size == size:
+                    series.load(*arrays)
+        self.dispatcher = None  # DriverDispatcher forwarding commands to device hardware
+        self.energy = None  # EnergyMeter integrating device power, see smart_home.energy
+        self.energy_snapshot = None if snapshot is None else snapshot["energy"]  # restored by the EnergyMeter
+        self.events = EventBus()  # DeviceChanged, TotalsChanged, ActionLogged and PowerSampled events
+        self.events.subscribe(DeviceChanged, self._track_activity)
+        self.rules = RuleEngine(self)
+        self.recomputes = 0  # full power scans, for diagnostics
+        self.changes = 0  # device attribute changes applied, including rollbacks
+        # Running totals, adjusted by the delta of every state change
+        self.total_power, self.active_devices = self.recompute_totals()
+
+    def add_action(self, device, action, user="User"):
+        # Epoch seconds, never earlier than the previous entry so the log stays time-ordered
+        with self.lock:
+            timestamp = self._last_logged = max(time.time(), self._last_logged)
+            entry = {
+                "timestamp": timestamp,
+                "device": device,
+                "action": action,
+                "user": user
+            }
+            self.action_log.append(entry)
+            if self.log_store is not None:
+                self.log_store.append(entry)
+            self.events.publish(ActionLogged(entry))
+
+    def actions_between(self, start, end=None):
+        # Actions logged in [start, end) epoch seconds, newest first: a binary
+        # search of the buffer, or an index range scan of the log store when
+        # the range reaches past the buffer
+        if self.log_store is None or self.action_log.covers(start):
+            return self.action_log.between(start, end)
+        return self.log_store.between(start, end)
+
+    def actions_since(self, seconds):
+        return self.actions_between(time.time() - seconds)
+
+    def activity(self, device_id, start, end=None, resolution=DAY):
+        # Compacted activity of a device, see ActivityRollups.series
+        with self.lock:
+            return self.rollups.series(device_id, start, end, resolution)
+
+    def _track_activity(self, event):
+        # Every change, also those of scenes and rules, feeds the on-time rollups
+        self.rollups.changed(time.time(), self.devices[event.device_id])
+
+    def set_state(self, device_id, state):
+        with self.lock:
+            device = self.devices[device_id]
+            power_before = device.draw()
+            active_before = device.is_active()
+            device.state = state
+            self._apply_delta(device, "state", power_before, active_before)
+
+    def set_value(self, device_id, value):
+        with self.lock:
+            device = self.devices[device_id]
+            power_before = device.draw()
+            active_before = device.is_active()
+            device.value = value
+            self._apply_delta(device, "value", power_before, active_before)
+
+    def _apply_delta(self, device, attribute, power_before, active_before):
+        power_delta = device.draw() - power_before
+        self.changes += 1
+        self.total_power += power_delta
+        self.active_devices += device.is_active() - active_before
+        change = (device.id, attribute, getattr(device, attribute))
+        self._notify([change])
+        self._evaluate([change], power_delta)
+
+    def _evaluate(self, changes, power_delta):
+        # Rules run once the change is fully applied, so they see the new totals
+        for device_id, attribute, value in changes:
+            self.rules.changed(device_id, attribute, value)
+        if power_delta:
+            self.rules.changed(POWER, "watts", self.total_power)
+
+    def toggle(self, device_id, user="User"):
+        with self.lock:
+            device = self.devices[device_id]
+            state, action = TOGGLES[device.state]
+            # Logged first so that records of rules it triggers come after it
+            self.add_action(device_id, action, user)
+            self.set_state(device_id, state)
+            self.command(device_id, "state", state.name)
+            return device
+
+    def command(self, device_id, attribute, value):
+        # Hand a user command to the device driver without waiting for the reply
+        if self.dispatcher is not None:
+            self.dispatcher.submit(device_id, attribute, value)
+
+    def apply_scene(self, name, user="User"):
+        return self.apply_changes(scene_changes(self.devices, name), f"Scene: {name}", user)
+
+    def apply_changes(self, changes, label, user="User"):
+        # Applies (device_id, attribute, value) changes as one transaction with
+        # one log record and one TotalsChanged event. If the hardware rejects any
+        # command of the batch, the devices still holding the batch's values
+        # are restored.
+        with self.lock:
+            power_before = self.total_power
+            undo = self._transact(changes)
+            if not undo:
+                return undo
+            applied = [(device_id, attribute, getattr(self.devices[device_id], attribute))
+                       for device_id, attribute, value in undo]
+            self.add_action("scene", f"{label} ({len(undo)} devices)", user)
+            self._notify(undo)
+            future = None if self.dispatcher is None else self.dispatcher.submit_batch(self._commands(applied))
+            self._evaluate(applied, self.total_power - power_before)
+            # Attached after the rules ran: a finished future calls back at once
+            if future is not None:
+                future.add_done_callback(lambda f: self._confirm(f, undo, applied, label))
+            return undo
+
+    def _transact(self, changes):
+        # All changes or none; returns the changes that undo the batch
+        undo = []
+        power_delta = 0
+        active_delta = 0
+        try:
+            for device_id, attribute, value in changes:
+                device = self.devices[device_id]
+                if attribute in ("state", "value") and getattr(device, attribute) == value:
+                    continue
+                if attribute == "state":
+                    # Only the other state of the device's own pair, e.g. a door never turns ON
+                    if device.state is None or value != TOGGLES[device.state][0]:
+                        raise ValueError(f"{device_id} cannot be set to {value!r}")
+                elif attribute != "value" or device.state is not None:
+                    raise ValueError(f"{device_id} has no {attribute!r} to set")
+                power_before = device.draw()
+                active_before = device.is_active()
+                undo.append((device_id, attribute, getattr(device, attribute)))
+                setattr(device, attribute, value)
+                power_delta += device.draw() - power_before
+                active_delta += device.is_active() - active_before
+        except Exception:
+            for device_id, attribute, value in reversed(undo):
+                setattr(self.devices[device_id], attribute, value)
+            raise
+        self.changes += len(undo)
+        self.total_power += power_delta
+        self.active_devices += active_delta
+        undo.reverse()
+        return undo
+
+    def _confirm(self, future, undo, applied, label):
+        with self.lock:
+            if future.cancelled() or future.exception() is None:
+                return
+            # Devices changed since the batch keep their newer values
+            current = {(device_id, attribute) for device_id, attribute, value in applied
+                       if getattr(self.devices[device_id], attribute) == value}
+            undo = [change for change in undo if (change[0], change[1]) in current]
+            self._transact(undo)
+            self.add_action("scene", f"{label} rolled back: {future.exception()}", "System")
+            self._notify(undo)
+            self.dispatcher.submit_batch(self._commands(undo))
+
+    def _commands(self, changes):
+        return [
+            (device_id, attribute, value.name if attribute == "state" else value)
+            for device_id, attribute, value in changes
+        ]
+
+    def _notify(self, changes):
+        # One event per changed device with its current value, then the totals
+        for device_id, attribute, value in changes:
+            self.events.publish(DeviceChanged(device_id, attribute, getattr(self.devices[device_id], attribute)))
+        self.events.publish(TotalsChanged(self.total_power, self.active_devices))
+
+    def recompute_totals(self):
+        # Full scan; only used at start-up and to check the running totals
+        self.recomputes += 1
+        total = 0
+        active = 0
+        for device in self.devices:
+            total += device.draw()
+            active += device.is_active()
+        return total, active
+
+    def check_totals(self):
+        return (self.total_power, self.active_devices) == self.recompute_totals()
+
+    def get_current_power(self):
+        return self.total_power
+
+    def close(self):
+        if self.log_store is not None:
+            self.log_store.close()
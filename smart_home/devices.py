@@ -0,0 +1,128 @@
+from enum import IntEnum
+import tracemalloc
+
+class DeviceType(IntEnum):
+    LIGHT = 0
+    DOOR = 1
+    THERMOSTAT = 2
+    FAN = 3
+    TV = 4
+    CAMERA = 5
+
+class State(IntEnum):
+    OFF = 0
+    ON = 1
+    LOCKED = 2
+    UNLOCKED = 3
+
+# Devices driven by a slider value instead of an on/off state
+SLIDER_TYPES = (DeviceType.THERMOSTAT, DeviceType.FAN)
+
+# Next state and log action for each toggle
+TOGGLES = {
+    State.OFF: (State.ON, "Turn ON"),
+    State.ON: (State.OFF, "Turn OFF"),
+    State.LOCKED: (State.UNLOCKED, "Unlock"),
+    State.UNLOCKED: (State.LOCKED, "Lock"),
+}
+
+class Device:
+    # Compact record: no per-instance __dict__, type and state are small enum ints
+    __slots__ = ("id", "name", "type", "room", "power", "state", "value")
+
+    def __init__(self, device_id, name, device_type, room, power, state=None, value=0):
+        self.id = device_id
+        self.name = name
+        self.type = device_type
+        self.room = room
+        self.power = power
+        self.state = state
+        self.value = value
+
+    @property
+    def status(self):
+        # Display form; slider devices have no state and show their value
+        return self.state.name if self.state is not None else self.value
+
+    def draw(self):
+        if self.type == DeviceType.FAN:
+            return self.value * 50
+        if self.type == DeviceType.THERMOSTAT or self.state == State.ON or self.state == State.LOCKED:
+            return self.power
+        return 0
+
+    def is_active(self):
+        return (self.state == State.ON or self.state == State.UNLOCKED or
+                (self.type == DeviceType.FAN and self.value > 0))
+
+DEFAULT_DEVICES = [
+    # id, name, type, room, power, state, value
+    ("light1", "Living Room Light", DeviceType.LIGHT, "Living Room", 60, State.OFF),
+    ("light2", "Bedroom Light", DeviceType.LIGHT, "Bedroom", 40, State.OFF),
+    ("light3", "Kitchen Light", DeviceType.LIGHT, "Kitchen", 50, State.OFF),
+    ("door1", "Front Door", DeviceType.DOOR, "Hallway", 5, State.LOCKED),
+    ("door2", "Back Door", DeviceType.DOOR, "Kitchen", 5, State.LOCKED),
+    ("thermostat1", "Thermostat", DeviceType.THERMOSTAT, "Living Room", 200, None, 22.0),
+    ("fan1", "Ceiling Fan", DeviceType.FAN, "Bedroom", 0, None, 0),
+    ("tv1", "Smart TV", DeviceType.TV, "Living Room", 150, State.OFF),
+    ("camera1", "Security Camera", DeviceType.CAMERA, "Hallway", 10, State.OFF),
+]
+
+class DeviceRegistry:
+    # Devices by id, in insertion order, with room and type indexes
+    def __init__(self, devices=()):
+        self._devices = {}
+        self.by_room = {}
+        self.by_type = {}
+        for device in devices:
+            self.add(device)
+
+    def add(self, device):
+        if device.id in self._devices:
+            raise ValueError(f"Duplicate device id: {device.id}")
+        self._devices[device.id] = device
+        self.by_room.setdefault(device.room, []).append(device.id)
+        self.by_type.setdefault(device.type, []).append(device.id)
+
+    def __getitem__(self, device_id):
+        return self._devices[device_id]
+
+    def __contains__(self, device_id):
+        return device_id in self._devices
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __iter__(self):
+        return iter(self._devices.values())
+
+    def select(self, room=None, device_type=None):
+        # Matching ids from the room/type indexes, without scanning every device
+        if room is not None:
+            ids = self.by_room.get(room, [])
+            if device_type is not None:
+                ids = [i for i in ids if self._devices[i].type == device_type]
+            return ids
+        if device_type is not None:
+            return self.by_type.get(device_type, [])
+        return list(self._devices)
+
+def measure_device_memory(count=10000):
+    # Bytes per device for the old dict-of-dicts layout and for Device records
+    def as_dict(device_id, i):
+        return {"name": f"Light {i}", "type": "light", "room": "Living Room", "status": "OFF", "power": 60}
+
+    def as_record(device_id, i):
+        return Device(device_id, f"Light {i}", DeviceType.LIGHT, "Living Room", 60, State.OFF)
+
+    result = {}
+    for label, build in (("dict", as_dict), ("slots", as_record)):
+        tracemalloc.start()
+        devices = {}
+        for i in range(count):
+            device_id = f"light{i}"
+            devices[device_id] = build(device_id, i)
+        result[label] = tracemalloc.get_traced_memory()[0] / count
+        tracemalloc.stop()
+        del devices
+    return result
@@ -0,0 +1,98 @@
+import json
+import time
+
+class Histogram:
+    # Latency histogram with power-of-two microsecond buckets: bucket b holds
+    # durations below 2**b microseconds
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * 40
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.buckets[min(int(seconds * 1e6).bit_length(), 39)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, share):
+        # Upper bound of the bucket holding the requested share, in seconds
+        target = share * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(2 ** bucket / 1e6, self.max)
+        return 0.0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+            "buckets_us": {2 ** b: c for b, c in enumerate(self.buckets) if c},
+        }
+
+class Instrumentation:
+    # Opt-in latency histograms. Wrappers stay in place when it is
+    # disabled and then cost a single attribute check per call.
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+
+    def timed(self, name, fn):
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    def reset(self):
+        self.histograms.clear()
+
+    def snapshot(self, gauges=None):
+        return {
+            "timestamp": time.time(),
+            "enabled": self.enabled,
+            "handlers": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+            "gauges": gauges or {},
+        }
+
+    def export(self, path, gauges=None):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(gauges), f, indent=2)
+        return path
+
+def controller_gauges(controller, scheduler=None):
+    # Point-in-time sizes and counters from the controller and the render scheduler
+    gauges = {
+        "devices": len(controller.devices),
+        "action_log_size": len(controller.action_log),
+        "action_log_total": controller.action_log.total,
+        "power_recomputes": controller.recomputes,
+        "rules": len(controller.rules),
+        "rules_fired": controller.rules.fired,
+        "rules_suppressed": controller.rules.suppressed,
+        "rules_failed": controller.rules.failed,
+        "event_subscriptions": len(controller.events),
+    }
+    if scheduler is not None:
+        gauges["page_updates"] = scheduler.flushes
+        gauges["page_updates_coalesced"] = scheduler.coalesced
+    return gauges
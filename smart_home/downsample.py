@@ -0,0 +1,41 @@
+def min_max(values, buckets):
+    # (min, max) of each of `buckets` equal slices of values
+    n = len(values)
+    if n <= buckets:
+        return [(value, value) for value in values]
+    step = n / buckets
+    ranges = []
+    for i in range(buckets):
+        chunk = values[int(i * step):int((i + 1) * step)]
+        ranges.append((min(chunk), max(chunk)))
+    return ranges
+
+def lttb(values, threshold):
+    # Largest-Triangle-Three-Buckets on evenly spaced values: keeps the first
+    # and last point and, per bucket, the point that best preserves the shape
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(values)
+    sampled = [values[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        ax = a
+        ay = values[a]
+        best = start = int(i * every) + 1
+        best_area = -1.0
+        for j in range(start, next_start):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(values[best])
+        a = best
+    sampled.append(values[-1])
+    return sampled
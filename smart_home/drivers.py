@@ -0,0 +1,269 @@
+import asyncio
+from collections import deque
+import json
+import random
+import threading
+import time
+
+from smart_home.stats import percentile
+
+DRIVER_TIMEOUT = 2.0  # seconds per attempt
+DRIVER_RETRIES = 2  # extra attempts after a timeout or a dropped connection
+DRIVER_POOL_SIZE = 8  # open connections per driver
+DRIVER_BACKOFF = 0.05  # seconds, doubled after every failed attempt
+
+class DriverError(Exception):
+    pass
+
+class DeviceDriver:
+    # Async interface to real devices; send() returns the device's reply
+    async def send(self, device_id, attribute, value):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class TcpDriver(DeviceDriver):
+    # JSON lines over TCP through a small connection pool. Every attempt has a
+    # timeout; timeouts and dropped connections are retried with backoff,
+    # errors reported by the device are not.
+    def __init__(self, host, port, pool_size=DRIVER_POOL_SIZE, timeout=DRIVER_TIMEOUT,
+                 retries=DRIVER_RETRIES, backoff=DRIVER_BACKOFF):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._idle = []
+        self._opened = 0
+        self._available = None  # created on first use, inside the driver's loop
+
+    async def _acquire(self):
+        if self._available is None:
+            self._available = asyncio.Semaphore(self.pool_size)
+        await self._available.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            connection = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except BaseException:
+            self._available.release()
+            raise
+        self._opened += 1
+        return connection
+
+    def _release(self, connection, healthy):
+        if healthy:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+            self._opened -= 1
+        self._available.release()
+
+    async def send(self, device_id, attribute, value):
+        message = json.dumps({"device": device_id, "attribute": attribute, "value": value}).encode() + b"\n"
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            connection = None
+            try:
+                # Inside the try, so refused connections and connect timeouts are retried too
+                connection = await self._acquire()
+                reader, writer = connection
+                writer.write(message)
+                await writer.drain()
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+                if not line:
+                    raise ConnectionError("connection closed by device")
+            except (OSError, asyncio.TimeoutError) as exc:
+                if connection is not None:
+                    self._release(connection, False)
+                error = exc
+                continue
+            self._release(connection, True)
+            reply = json.loads(line)
+            if not reply.get("ok"):
+                raise DriverError(f"{device_id}: {reply.get('error', 'rejected')}")
+            return reply
+        raise DriverError(f"{device_id}: no reply after {self.retries + 1} attempts ({error!r})")
+
+    async def close(self):
+        while self._idle:
+            reader, writer = self._idle.pop()
+            writer.close()
+            await writer.wait_closed()
+        self._opened = 0
+
+class SimulatedDeviceServer:
+    # Local stand-in for device hardware: answers JSON-line commands after an
+    # injected latency and can fail a share of them, for offline testing
+    def __init__(self, host="127.0.0.1", port=0, latency=0.02, jitter=0.01, failure_rate=0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.states = {}
+        self.handled = 0
+        self._server = None
+        self._connections = {}  # handler task -> writer
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Closing the sockets lets every handler finish its loop normally
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+                self.handled += 1
+                if random.random() < self.failure_rate:
+                    reply = {"ok": False, "error": "device did not respond"}
+                else:
+                    self.states[(request["device"], request["attribute"])] = request["value"]
+                    reply = {"ok": True, "device": request["device"], "value": request["value"]}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+
+class DriverDispatcher:
+    # Runs a driver on its own asyncio loop in a background thread, so UI
+    # handlers hand commands over without waiting. Commands for different
+    # devices run concurrently. A command waits for the previous one to the
+    # same device, so a device receives its commands in the order they were
+    # submitted and ends in the last state sent.
+    def __init__(self, driver, on_error=None, history=10000):
+        self.driver = driver
+        self.on_error = on_error  # called with (device_id, attribute, value, exc)
+        self.sent = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=history)  # seconds, most recent commands
+        self._last = {}  # device id -> future of the newest command submitted for it
+        self._order_lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, device_id, attribute, value):
+        # The order is fixed here, in the submitting thread: tasks on the loop
+        # may start later than commands submitted after them
+        with self._order_lock:
+            previous = self._last.get(device_id)
+            future = asyncio.run_coroutine_threadsafe(self._send(device_id, attribute, value, previous), self.loop)
+            self._last[device_id] = future
+        return future
+
+    def submit_batch(self, commands):
+        # Sends (device_id, attribute, value) commands, concurrently across
+        # devices; the future fails with the first error once every command
+        # has finished
+        futures = [self.submit(*command) for command in commands]
+        return asyncio.run_coroutine_threadsafe(self._send_batch(futures), self.loop)
+
+    def run(self, coroutine):
+        # Run a coroutine on the driver loop and wait for its result
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def _send(self, device_id, attribute, value, previous=None):
+        start = time.perf_counter()
+        if previous is not None:
+            # Its outcome is reported through its own future
+            await asyncio.wait([asyncio.wrap_future(previous)])
+        try:
+            reply = await self.driver.send(device_id, attribute, value)
+        except Exception as exc:
+            self.failed += 1
+            if self.on_error is not None:
+                self.on_error(device_id, attribute, value, exc)
+            raise
+        self.sent += 1
+        self.latencies.append(time.perf_counter() - start)
+        return reply
+
+    async def _send_batch(self, futures):
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def close(self):
+        self.run(self.driver.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+def connect(address, on_error=None):
+    # Dispatcher for "host:port", or for a local simulated server if address is "simulated"
+    dispatcher = DriverDispatcher(None, on_error)
+    if address == "simulated":
+        server = dispatcher.run(SimulatedDeviceServer().start())
+        host, port = server.host, server.port
+    else:
+        host, port = address.rsplit(":", 1)
+    dispatcher.driver = TcpDriver(host, int(port))
+    return dispatcher
+
+async def measure_driver(count=2000, devices=100, latency=0.02, jitter=0.01, failure_rate=0.0,
+                         pool_size=DRIVER_POOL_SIZE):
+    # Fires `count` commands at a local simulated server, all at once, and
+    # reports throughput and latency percentiles
+    server = await SimulatedDeviceServer(latency=latency, jitter=jitter, failure_rate=failure_rate).start()
+    driver = TcpDriver(server.host, server.port, pool_size=pool_size)
+    latencies = []
+    failures = 0
+
+    async def one(i):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            await driver.send(f"light-{i % devices}", "state", "ON" if i % 2 else "OFF")
+        except DriverError:
+            failures += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    await driver.close()
+    await server.stop()
+    return {
+        "commands": count,
+        "failures": failures,
+        "seconds": elapsed,
+        "per_second": count / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure driver throughput against the simulated device server")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--pool-size", type=int, default=DRIVER_POOL_SIZE)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(measure_driver(args.count, latency=args.latency, failure_rate=args.failure_rate,
+                                                pool_size=args.pool_size)), indent=2))
@@ -0,0 +1,173 @@
+import time
+
+import numpy as np
+
+from smart_home.events import DeviceChanged
+from smart_home.power_series import DAY
+
+ENERGY_CAPACITY = 1 << 16  # power changes held before the arrays grow (doubling)
+JOULES_PER_KWH = 3.6e6
+
+class EnergyMeter:
+    # Energy used by every device, integrated over the intervals between its
+    # power changes. Each DeviceChanged that changes a device's draw() (a
+    # toggle, a setpoint or fan speed, a scene, a rule or a rollback) appends
+    # (timestamp, device index, watts added) to three arrays, oldest first.
+    # Reports turn those into kWh per device and time bucket with bincount and
+    # cumulative sums, so their cost does not depend on Python loops over the
+    # history.
+    def __init__(self, controller, capacity=ENERGY_CAPACITY):
+        self.controller = controller
+        devices = list(controller.devices)
+        self.device_ids = [device.id for device in devices]
+        self._index = {device_id: i for i, device_id in enumerate(self.device_ids)}
+        self.rooms = list(dict.fromkeys(device.room for device in devices))
+        room_index = {room: i for i, room in enumerate(self.rooms)}
+        self._room_of = np.array([room_index[device.room] for device in devices], dtype=np.intp)
+        self._watts = np.zeros(len(devices))  # power of each device as of its latest record
+        self._ts = np.empty(capacity)
+        self._device = np.empty(capacity, dtype=np.int32)
+        self._delta = np.empty(capacity)
+        self._count = 0
+        self._last = 0.0
+        self._subscription = None
+        if controller.energy_snapshot is not None:
+            self.load(*controller.energy_snapshot)
+
+    def indexes(self, device_ids):
+        # Positions in device_ids, for record_many()
+        return np.array([self._index[device_id] for device_id in device_ids], dtype=np.int32)
+
+    def _reserve(self, count):
+        if self._count + count > len(self._ts):
+            capacity = max(2 * len(self._ts), self._count + count)
+            for name in ("_ts", "_device", "_delta"):
+                old = getattr(self, name)
+                grown = np.empty(capacity, dtype=old.dtype)
+                grown[:self._count] = old[:self._count]
+                setattr(self, name, grown)
+
+    def record(self, ts, device_id, watts):
+        # device_id draws `watts` from ts on; timestamps never go backwards
+        index = self._index[device_id]
+        delta = watts - self._watts[index]
+        if not delta:
+            return
+        self._reserve(1)
+        self._last = max(ts, self._last)
+        self._ts[self._count] = self._last
+        self._device[self._count] = index
+        self._delta[self._count] = delta
+        self._watts[index] = watts
+        self._count += 1
+
+    def record_many(self, ts, indexes, watts):
+        # record() for several devices at once: `indexes` (distinct, from
+        # indexes()) draw the matching `watts` from ts on
+        deltas = watts - self._watts[indexes]
+        changed = deltas != 0
+        indexes = indexes[changed]
+        count = len(indexes)
+        if not count:
+            return
+        self._reserve(count)
+        self._last = max(ts, self._last)
+        self._ts[self._count:self._count + count] = self._last
+        self._device[self._count:self._count + count] = indexes
+        self._delta[self._count:self._count + count] = deltas[changed]
+        self._watts[indexes] = watts[changed]
+        self._count += count
+
+    def _changed(self, event):
+        self.record(time.time(), event.device_id, self.controller.devices[event.device_id].draw())
+
+    def start(self, now=None):
+        # Records every device's current draw, then follows its changes
+        now = time.time() if now is None else now
+        with self.controller.lock:
+            for device in self.controller.devices:
+                self.record(now, device.id, device.draw())
+            if self._subscription is None:
+                self._subscription = self.controller.events.subscribe(DeviceChanged, self._changed)
+
+    def stop(self):
+        if self._subscription is not None:
+            self.controller.events.unsubscribe(self._subscription)
+            self._subscription = None
+
+    def _columns(self):
+        # Views of the recorded part (appends only write past it) and the
+        # power of each device after the last record
+        with self.controller.lock:
+            count = self._count
+            return self._ts[:count], self._device[:count], self._delta[:count], self._watts.copy()
+
+    def dump(self):
+        return tuple(column.tobytes() for column in self._columns()[:3])
+
+    def load(self, device_ids, ts, devices, deltas):
+        # Inverse of dump(); records of devices no longer present are dropped
+        index = np.array([self._index.get(device_id, -1) for device_id in device_ids], dtype=np.int32)
+        devices = index[np.frombuffer(devices, dtype=np.int32)]
+        keep = devices >= 0
+        ts = np.frombuffer(ts)[keep]
+        deltas = np.frombuffer(deltas)[keep]
+        devices = devices[keep]
+        self._count = len(ts)
+        capacity = max(2 * self._count, len(self._ts))
+        for name, column in (("_ts", ts), ("_device", devices), ("_delta", deltas)):
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._count] = column
+            setattr(self, name, grown)
+        self._last = ts[-1] if len(ts) else 0.0
+        self._watts = np.bincount(devices, weights=deltas, minlength=len(self.device_ids))
+
+    def _joules(self, times):
+        # Joules each device used from times[0] up to each of the ascending
+        # `times`, shape (devices, times). A record raising a device's power
+        # by delta at ts adds delta * (t - ts) by time t, so per device it is
+        # power0 * (t - t0) + t * sum(delta) - sum(delta * ts) over the records
+        # in (t0, t]. Only records after times[0] are read: power0 is the
+        # current power minus their deltas.
+        ts, devices, deltas, watts = self._columns()
+        first = np.searchsorted(ts, times[0], side="right")
+        ts, devices, deltas = ts[first:], devices[first:].astype(np.intp), deltas[first:]
+        power = watts - np.bincount(devices, weights=deltas, minlength=len(watts))
+        count = np.searchsorted(ts, times[-1], side="right")
+        bins = np.searchsorted(times, ts[:count])  # first of `times` at or after each record
+        cells = devices[:count] * len(times) + bins
+        shape = (len(watts), len(times))
+        size = shape[0] * shape[1]
+        ts = ts[:count] - times[0]  # relative times keep the products small
+        rates = power[:, None] + np.bincount(cells, weights=deltas[:count], minlength=size).reshape(shape).cumsum(axis=1)
+        offsets = np.bincount(cells, weights=deltas[:count] * ts, minlength=size).reshape(shape).cumsum(axis=1)
+        return rates * (times - times[0]) - offsets
+
+    def table(self, start, end=None, width=DAY):
+        # kWh of every device in buckets of `width` seconds aligned like the
+        # power rollups: (bucket starts, array of shape (devices, buckets)).
+        # The first and last buckets are cut at start and end (now by default).
+        end = time.time() if end is None else end
+        edges = np.concatenate(([start], np.arange((start // width + 1) * width, end, width), [end]))
+        return edges[:-1] // width * width, np.diff(self._joules(edges), axis=1) / JOULES_PER_KWH
+
+    def _kwh(self, start, end):
+        end = time.time() if end is None else end
+        return np.diff(self._joules(np.array([start, end], dtype=float)), axis=1)[:, 0] / JOULES_PER_KWH
+
+    def by_device(self, start, end=None):
+        return dict(zip(self.device_ids, self._kwh(start, end).tolist()))
+
+    def by_room(self, start, end=None):
+        kwh = np.bincount(self._room_of, weights=self._kwh(start, end), minlength=len(self.rooms))
+        return dict(zip(self.rooms, kwh.tolist()))
+
+    def daily(self, start, end=None, room=None):
+        # (day start, kWh) of the whole home, or of one room, oldest first
+        days, kwh = self.table(start, end, DAY)
+        if room is not None:
+            kwh = kwh[self._room_of == self.rooms.index(room)]
+        return list(zip(days.tolist(), kwh.sum(axis=0).tolist()))
+
+    def total(self, start, end=None):
+        return float(self._kwh(start, end).sum())
@@ -0,0 +1,72 @@
+import threading
+
+class DeviceChanged:
+    # `attribute` ("state" or "value") of a device changed, from any source:
+    # a UI session, a scene, a rule or a rollback
+    __slots__ = ("device_id", "attribute", "value")
+
+    def __init__(self, device_id, attribute, value):
+        self.device_id = device_id
+        self.attribute = attribute
+        self.value = value
+
+class TotalsChanged:
+    # Running totals after a change or a whole batch
+    __slots__ = ("total_power", "active_devices")
+
+    def __init__(self, total_power, active_devices):
+        self.total_power = total_power
+        self.active_devices = active_devices
+
+class ActionLogged:
+    __slots__ = ("entry",)
+
+    def __init__(self, entry):
+        self.entry = entry
+
+class PowerSampled:
+    __slots__ = ("ts", "watts")
+
+    def __init__(self, ts, watts):
+        self.ts = ts
+        self.watts = watts
+
+class EventBus:
+    # Handlers by (event type, device id). A DeviceChanged event only reaches
+    # the handlers of its device plus those subscribed to every device, so its
+    # cost is the number of those subscribers, not of all subscribers.
+    # Handler tuples are replaced on (un)subscribe, so publish needs no lock
+    # and handlers may unsubscribe while an event is being delivered.
+    def __init__(self):
+        self._handlers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type, handler, device_id=None):
+        # device_id limits a DeviceChanged subscription to one device; returns
+        # the subscription to pass to unsubscribe()
+        key = (event_type, device_id)
+        with self._lock:
+            self._handlers[key] = self._handlers.get(key, ()) + (handler,)
+        return key, handler
+
+    def unsubscribe(self, subscription):
+        key, handler = subscription
+        with self._lock:
+            handlers = list(self._handlers[key])
+            handlers.remove(handler)
+            if handlers:
+                self._handlers[key] = tuple(handlers)
+            else:
+                del self._handlers[key]
+
+    def publish(self, event):
+        event_type = type(event)
+        device_id = getattr(event, "device_id", None)
+        if device_id is not None:
+            for handler in self._handlers.get((event_type, device_id), ()):
+                handler(event)
+        for handler in self._handlers.get((event_type, None), ()):
+            handler(event)
+
+    def __len__(self):
+        return sum(len(handlers) for handlers in self._handlers.values())
@@ -0,0 +1,120 @@
+import csv
+from datetime import datetime
+import json
+import os
+import sys
+
+EXPORT_CHUNK_SIZE = 10000  # log rows read and written at a time
+EXPORT_COLUMNS = ("id", "timestamp", "time", "device", "action", "user")
+
+def read_checkpoint(path):
+    # Id of the last row a previous export wrote, None before the first one
+    try:
+        with open(path) as f:
+            return json.load(f)["last_id"]
+    except FileNotFoundError:
+        return None
+
+def write_checkpoint(path, last_id, rows):
+    # Replaced atomically, so an interrupted export never moves it
+    temp = f"{path}.tmp"
+    with open(temp, "w") as f:
+        json.dump({"last_id": last_id, "rows": rows, "exported_at": datetime.now().isoformat(timespec="seconds")}, f)
+    os.replace(temp, path)
+
+def _rows(chunk):
+    # Adds the ISO time next to the epoch timestamp for tools that want text.
+    # Neighbouring rows mostly share a second, which is formatted once.
+    rows = []
+    second = None
+    for row_id, timestamp, *rest in chunk:
+        if int(timestamp) != second:
+            second = int(timestamp)
+            prefix = datetime.fromtimestamp(second).isoformat()
+        rows.append((row_id, timestamp, f"{prefix}.{int(timestamp % 1 * 1000):03d}", *rest))
+    return rows
+
+def _write_csv(chunks, output):
+    f = sys.stdout if output == "-" else open(output, "w", newline="")
+    try:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(_rows(chunk))
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+def _write_parquet(chunks, output):
+    # Optional dependency: only Parquet export needs pyarrow
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from exc
+
+    schema = pa.schema([("id", pa.int64()), ("timestamp", pa.float64()), ("time", pa.string()),
+                        ("device", pa.string()), ("action", pa.string()), ("user", pa.string())])
+    # One row group per chunk, so the file is written without holding the log
+    with pq.ParquetWriter(output, schema) as writer:
+        for chunk in chunks:
+            columns = list(zip(*_rows(chunk)))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+
+WRITERS = {"csv": _write_csv, "parquet": _write_parquet}
+
+def export_actions(source, output, fmt="csv", checkpoint=None, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    # Streams the log of `source` (a LogStore, or an ActionLog for the
+    # in-memory buffer) to `output` oldest first. filters: device, user,
+    # start, end (epoch seconds). With a checkpoint file only rows added since
+    # the previous export are written, and the file is advanced afterwards.
+    # Returns the number of rows written.
+    after = None if checkpoint is None else read_checkpoint(checkpoint)
+    written = 0
+    last_id = after
+
+    def chunks():
+        nonlocal written, last_id
+        for chunk in source.scan(after, chunk_size, **filters):
+            written += len(chunk)
+            last_id = chunk[-1][0]
+            yield chunk
+
+    WRITERS[fmt](chunks(), output)
+    if checkpoint is not None and last_id is not None:
+        write_checkpoint(checkpoint, last_id, written)
+    return written
+
+def parse_time(text):
+    return None if text is None else datetime.fromisoformat(text).timestamp()
+
+if __name__ == "__main__":
+    import argparse
+
+    from smart_home.log_store import LogStore
+
+    parser = argparse.ArgumentParser(description="Export a persistent action log to CSV or Parquet")
+    parser.add_argument("log", help="SQLite action log file")
+    parser.add_argument("--output", default="-", help="output file, - for stdout (CSV only)")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--device")
+    parser.add_argument("--user")
+    parser.add_argument("--since", help="ISO date/time, inclusive")
+    parser.add_argument("--until", help="ISO date/time, exclusive")
+    parser.add_argument("--checkpoint", help="file remembering the last exported row, for incremental exports")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    if args.format == "parquet" and args.output == "-":
+        parser.error("Parquet output needs --output")
+    # LogStore would create an empty log for a mistyped path
+    if not os.path.isfile(args.log):
+        parser.error(f"{args.log}: no such file")
+
+    store = LogStore(args.log)
+    try:
+        count = export_actions(store, args.output, args.format, args.checkpoint, args.chunk_size, device=args.device,
+                               user=args.user, start=parse_time(args.since), end=parse_time(args.until))
+    finally:
+        store.close()
+    print(f"{count} rows exported", file=sys.stderr)
@@ -0,0 +1,155 @@
+import csv
+import json
+import random
+import re
+import time
+
+from smart_home.action_log import parse_action
+from smart_home.devices import DeviceType
+from smart_home.events import TotalsChanged
+from smart_home.stats import percentile
+
+SCENE_ACTION = re.compile(r"Scene: (.+) \(\d+ devices\)$")
+
+# A load event is (offset seconds, kind, device id, value, user). kind is
+# "toggle", "state" (set a toggle state), "value" or "scene" (the device id
+# is then the scene name).
+
+def trace_events(entries):
+    # Load events from action log entries in the shape add_action writes,
+    # oldest first. Entries that are consequences of others (rules, rollbacks,
+    # failed commands) are skipped, since replaying their cause recreates them.
+    first = None
+    for entry in entries:
+        if first is None:
+            first = entry["timestamp"]
+        offset = entry["timestamp"] - first
+        parsed = parse_action(entry["action"])
+        if parsed is not None:
+            kind, value = parsed
+            yield offset, "state" if kind == "state" else "value", entry["device"], value, entry["user"]
+        elif entry["device"] == "scene" and (match := SCENE_ACTION.match(entry["action"])):
+            yield offset, "scene", match.group(1), None, entry["user"]
+
+def read_trace(path):
+    # Entries from a CSV written by smart_home.export, or from JSON lines
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {**row, "timestamp": float(row["timestamp"])}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def poisson_events(devices, rate, duration, slider_share=0.2, seed=None):
+    # Synthetic traffic: Poisson arrivals at `rate` events per second for
+    # `duration` seconds, on uniformly chosen devices. Toggle devices flip,
+    # slider devices get a new committed value (one per drag).
+    rng = random.Random(seed)
+    toggles = [device for device in devices if device.state is not None]
+    sliders = [device for device in devices if device.state is None]
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        if sliders and (not toggles or rng.random() < slider_share):
+            device = rng.choice(sliders)
+            if device.type == DeviceType.FAN:
+                value = rng.randint(0, 3)
+            else:
+                value = round(rng.uniform(15, 30) * 2) / 2
+            yield offset, "value", device.id, value, "Load"
+        else:
+            device = rng.choice(toggles)
+            yield offset, "toggle", device.id, None, "Load"
+        offset += rng.expovariate(rate)
+
+def apply_event(controller, kind, target, value, user):
+    # The same controller calls the UI handlers make
+    if kind == "toggle":
+        controller.toggle(target, user)
+    elif kind == "state":
+        if controller.devices[target].state != value:
+            controller.toggle(target, user)
+    elif kind == "value":
+        if controller.devices[target].type == DeviceType.FAN:
+            value = int(value)
+            controller.add_action(target, f"Set speed to {value}", user)
+        else:
+            controller.add_action(target, f"Set to {value:.1f}°C", user)
+        controller.set_value(target, value)
+        controller.command(target, "value", value)
+    elif kind == "scene":
+        controller.apply_scene(target, user)
+
+def run_load(controller, events, speed=None, sessions=0):
+    # Applies events against the controller and reports throughput and
+    # per-event latency. speed: None or 0 runs as fast as possible, 1 at the
+    # recorded pace, 10 ten times faster. `sessions` adds that many summary
+    # subscribers, the per-change work each open UI session does.
+    def summary(event):
+        return f"{event.active_devices}", f"{len(controller.devices)}", f"{event.total_power}W"
+
+    subscriptions = [controller.events.subscribe(TotalsChanged, summary) for _ in range(sessions)]
+    latencies = []
+    lag = 0.0
+    skipped = 0
+    start = time.perf_counter()
+    try:
+        for offset, kind, target, value, user in events:
+            if speed:
+                due = start + offset / speed
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                else:
+                    lag = max(lag, -wait)
+            begin = time.perf_counter()
+            try:
+                apply_event(controller, kind, target, value, user)
+            except (KeyError, ValueError):
+                skipped += 1  # device or scene not in this registry
+                continue
+            latencies.append(time.perf_counter() - begin)
+        elapsed = time.perf_counter() - start
+    finally:
+        for subscription in subscriptions:
+            controller.events.unsubscribe(subscription)
+    return {
+        "events": len(latencies),
+        "skipped": skipped,
+        "seconds": elapsed,
+        "per_second": len(latencies) / elapsed if elapsed else None,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "max_us": max(latencies, default=0.0) * 1e6,
+        "max_lag_ms": lag * 1000,  # worst delay behind the schedule when paced
+        "totals_consistent": controller.check_totals(),
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    from smart_home.controller import SmartHomeController
+    from smart_home.simulator import generate_building
+
+    parser = argparse.ArgumentParser(description="Replay an action trace or generate Poisson load against the controller")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--trace", help="CSV from smart_home.export, or JSON lines of log entries")
+    source.add_argument("--rate", type=float, help="Poisson events per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of synthetic traffic")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = real time, 10 = ten times faster, 0 = flat out")
+    parser.add_argument("--rooms", type=int, default=0, help="generated building size; 0 uses the default devices")
+    parser.add_argument("--sessions", type=int, default=0, help="simulated UI sessions receiving every change")
+    parser.add_argument("--log-path", help="persistent action log, to include SQLite writes")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    controller = SmartHomeController(devices=generate_building(args.rooms) if args.rooms else None,
+                                     log_path=args.log_path)
+    if args.trace:
+        events = trace_events(read_trace(args.trace))
+    else:
+        events = poisson_events(list(controller.devices), args.rate, args.duration, seed=args.seed)
+    report = run_load(controller, events, args.speed, args.sessions)
+    controller.close()
+    print(json.dumps(report, indent=2))
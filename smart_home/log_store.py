@@ -0,0 +1,167 @@
+import atexit
+import sqlite3
+import threading
+
+LOG_BATCH_SIZE = 500  # queued entries that wake the writer early
+LOG_FLUSH_INTERVAL = 0.5  # seconds between writes of the queued entries
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp REAL NOT NULL,
+    device TEXT NOT NULL,
+    action TEXT NOT NULL,
+    user TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS actions_device ON actions (device, id);
+CREATE INDEX IF NOT EXISTS actions_user ON actions (user, id);
+CREATE INDEX IF NOT EXISTS actions_timestamp ON actions (timestamp);
+CREATE TABLE IF NOT EXISTS rollups (
+    device TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    actions INTEGER NOT NULL,
+    on_seconds REAL NOT NULL,
+    min_value REAL,
+    max_value REAL,
+    PRIMARY KEY (device, resolution, bucket)
+);
+CREATE TABLE IF NOT EXISTS open_intervals (
+    device TEXT PRIMARY KEY,
+    since REAL NOT NULL
+);
+"""
+
+class LogStore:
+    # Append-only action log in SQLite (WAL mode). append() only queues the
+    # entry; a writer thread inserts the queue in one transaction per batch.
+    # Queries page newest first with the id of the last row as the cursor.
+    def __init__(self, path, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)  # entries queued at exit are still written
+
+    def append(self, entry):
+        row = (entry["timestamp"], entry["device"], entry["action"], entry["user"])
+        with self._pending_lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._db_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT INTO actions (timestamp, device, action, user) VALUES (?, ?, ?, ?)", rows)
+            self._db.execute("COMMIT")
+            self.written += len(rows)
+
+    def _query(self, sql, params):
+        # Queued entries are written first so a query sees every append before it
+        self.flush()
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _where(self, filters):
+        clauses = []
+        params = []
+        for column, operator, value in filters:
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                params.append(value)
+        return f" WHERE {' AND '.join(clauses)}" if clauses else "", params
+
+    def page(self, limit, before=None, device=None, user=None, start=None, end=None):
+        # Up to `limit` entries older than the cursor `before`, newest first,
+        # and the cursor of the next page (None on the last page).
+        # start/end are epoch seconds.
+        if limit <= 0:
+            raise ValueError(f"page limit must be positive, got {limit}")
+        where, params = self._where((("id", "<", before), ("device", "=", device), ("user", "=", user),
+                                     ("timestamp", ">=", start), ("timestamp", "<", end)))
+        rows = self._query(f"SELECT id, timestamp, device, action, user FROM actions{where} ORDER BY id DESC LIMIT ?",
+                           (*params, limit + 1))
+        return [self._entry(row) for row in rows[:limit]], rows[limit - 1][0] if len(rows) > limit else None
+
+    def scan(self, after=None, chunk_size=10000, device=None, user=None, start=None, end=None):
+        # Oldest first, in chunks of (id, timestamp, device, action, user) rows
+        # with id > after; memory stays at one chunk however long the log is
+        while True:
+            where, params = self._where((("id", ">", after), ("device", "=", device), ("user", "=", user),
+                                         ("timestamp", ">=", start), ("timestamp", "<", end)))
+            rows = self._query(f"SELECT id, timestamp, device, action, user FROM actions{where} ORDER BY id LIMIT ?",
+                               (*params, chunk_size))
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][0]
+
+    def between(self, start, end=None):
+        # Entries logged in [start, end), newest first, through the timestamp index
+        rows = self._query("SELECT id, timestamp, device, action, user FROM actions "
+                           "WHERE timestamp >= ? AND timestamp < ? ORDER BY id DESC",
+                           (start, float("inf") if end is None else end))
+        return [self._entry(row) for row in rows]
+
+    def _entry(self, row):
+        return {"timestamp": row[1], "device": row[2], "action": row[3], "user": row[4]}
+
+    def latest(self, n):
+        return self.page(n)[0] if n > 0 else []
+
+    def __len__(self):
+        return self._query("SELECT count(*) FROM actions", ())[0][0]
+
+    def compact(self, through_id, rollups, open_intervals, expired=()):
+        # Saves updated rollup rows and the open on-intervals, drops expired
+        # rollups ((resolution, before) pairs) and deletes the raw rows up to
+        # through_id, in one transaction: after a crash every raw row is
+        # either still there or counted in the rollups, never both
+        self.flush()
+        with self._db_lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?)", rollups)
+            self._db.execute("DELETE FROM open_intervals")
+            self._db.executemany("INSERT INTO open_intervals VALUES (?, ?)", open_intervals)
+            self._db.executemany("DELETE FROM rollups WHERE resolution = ? AND bucket < ?", expired)
+            if through_id is not None:
+                self._db.execute("DELETE FROM actions WHERE id <= ?", (through_id,))
+            self._db.execute("COMMIT")
+
+    def load_rollups(self):
+        # Rollup rows and open on-intervals saved by compact()
+        return (self._query("SELECT * FROM rollups", ()),
+                self._query("SELECT device, since FROM open_intervals", ()))
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+        atexit.unregister(self.flush)
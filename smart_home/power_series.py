@@ -0,0 +1,127 @@
+from array import array
+import math
+import threading
+import time
+
+from smart_home.events import PowerSampled
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+POWER_SAMPLE_INTERVAL = 10  # seconds between get_current_power() samples
+
+class RollingSeries:
+    # Ring of `size` buckets, each `width` seconds wide. A bucket keeps the sum
+    # and count of its samples, so adding a sample is O(1) and memory is fixed.
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self._sums = array("d", [0.0]) * size
+        self._counts = array("l", [0]) * size
+        self._buckets = array("q", [-1]) * size  # bucket number held by each slot
+
+    def add(self, ts, value):
+        bucket = int(ts // self.width)
+        slot = bucket % self.size
+        if self._buckets[slot] != bucket:
+            # Slot still holds a bucket from a previous lap of the ring
+            self._buckets[slot] = bucket
+            self._sums[slot] = 0.0
+            self._counts[slot] = 0
+        self._sums[slot] += value
+        self._counts[slot] += 1
+
+    def dump(self):
+        return self._sums.tobytes(), self._counts.tobytes(), self._buckets.tobytes()
+
+    def load(self, sums, counts, buckets):
+        # Inverse of dump(), for a series of the same size
+        for values, data in ((self._sums, sums), (self._counts, counts), (self._buckets, buckets)):
+            if len(data) != len(values) * values.itemsize:
+                raise ValueError("rollup size does not match")
+        for values, data in ((self._sums, sums), (self._counts, counts), (self._buckets, buckets)):
+            values[:] = array(values.typecode, data)
+
+    def covers(self, start, now):
+        return now - start <= self.width * self.size
+
+    def window(self, start, end):
+        # Bucket averages from start up to end; None where nothing was sampled
+        values = []
+        for bucket in range(int(start // self.width), int(math.ceil(end / self.width))):
+            slot = bucket % self.size
+            if self._buckets[slot] == bucket and self._counts[slot]:
+                values.append(self._sums[slot] / self._counts[slot])
+            else:
+                values.append(None)
+        return values
+
+class PowerSeries:
+    # Per-minute power samples plus hourly, daily and weekly rollups, all
+    # updated on every sample so queries never rescan raw values
+    def __init__(self, minutes=7 * 24 * 60, hours=30 * 24, days=365, weeks=104):
+        self.resolutions = {
+            MINUTE: RollingSeries(MINUTE, minutes),
+            HOUR: RollingSeries(HOUR, hours),
+            DAY: RollingSeries(DAY, days),
+            WEEK: RollingSeries(WEEK, weeks),
+        }
+        self.samples = 0
+
+    def add(self, ts, watts):
+        self.samples += 1
+        for series in self.resolutions.values():
+            series.add(ts, watts)
+
+    def window(self, start, end=None, resolution=None, max_points=None):
+        # Picks the finest resolution that still covers the window and, if
+        # max_points is given, needs no more than that many buckets
+        if end is None:
+            end = time.time()
+        if resolution is None:
+            for width, series in self.resolutions.items():
+                resolution = width
+                fits = max_points is None or (end - start) / width <= max_points
+                if fits and series.covers(start, end):
+                    break
+        return self.resolutions[resolution].window(start, end)
+
+    def last(self, count, resolution, now=None):
+        # The `count` most recent buckets at the given resolution, oldest first
+        if now is None:
+            now = time.time()
+        end = (now // resolution + 1) * resolution
+        return self.resolutions[resolution].window(end - count * resolution, end)
+
+class PowerSampler:
+    # Background thread feeding controller.get_current_power() into a
+    # PowerSeries and publishing every sample on controller.events
+    def __init__(self, controller, series, interval=POWER_SAMPLE_INTERVAL):
+        self.controller = controller
+        self.series = series
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self, now=None):
+        ts = time.time() if now is None else now
+        watts = self.controller.get_current_power()
+        self.series.add(ts, watts)
+        self.controller.events.publish(PowerSampled(ts, watts))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()  # returns once a sample being taken is recorded
+
+    def _run(self):
+        self.sample()
+        while not self._stop.wait(self.interval):
+            self.sample()
@@ -0,0 +1,192 @@
+import threading
+import time
+
+from smart_home.events import ActionLogged
+from smart_home.power_series import DAY, HOUR
+
+RAW_LOG_WINDOW = 7 * DAY  # raw action log entries kept; older ones are compacted into rollups
+HOURLY_ROLLUP_WINDOW = 90 * DAY
+DAILY_ROLLUP_WINDOW = 5 * 365 * DAY
+RETENTION_INTERVAL = 60  # seconds between compaction runs
+RETENTION_CHUNK = 5000  # entries folded per step under the controller lock
+
+class ActivityRollups:
+    # Hourly and daily activity per device: action count, seconds on (or
+    # unlocked, or with the fan running) and min/max setpoint or fan speed.
+    # Actions are counted from log entries as they are compacted, in time
+    # order; scenes and rules log one record per batch, which counts for
+    # "scene". On-time and values are taken from every device change as it
+    # happens (see changed()), so batch changes open and close intervals too.
+    # An on-interval that is still open is kept in `open`.
+    def __init__(self):
+        self.buckets = {}  # (device, resolution) -> {bucket start: [actions, on seconds, min, max]}
+        self.open = {}  # device -> epoch seconds its current on-interval started
+        self._dirty = set()  # (device, resolution, bucket start) changed since take_dirty()
+
+    def _bucket(self, device, resolution, ts):
+        start = int(ts // resolution * resolution)
+        buckets = self.buckets.setdefault((device, resolution), {})
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = [0, 0.0, None, None]
+        self._dirty.add((device, resolution, start))
+        return bucket
+
+    def add(self, ts, device):
+        # One logged action of `device` (a device id or "scene")
+        for resolution in (HOUR, DAY):
+            self._bucket(device, resolution, ts)[0] += 1
+
+    def changed(self, ts, device):
+        # `device`, a Device, has just changed state or value
+        if device.state is None:
+            for resolution in (HOUR, DAY):
+                bucket = self._bucket(device.id, resolution, ts)
+                bucket[2] = device.value if bucket[2] is None else min(bucket[2], device.value)
+                bucket[3] = device.value if bucket[3] is None else max(bucket[3], device.value)
+        active = device.is_active()  # thermostats are never active
+        since = self.open.get(device.id)
+        if since is None and active:
+            self.open[device.id] = ts
+        elif since is not None and not active:
+            del self.open[device.id]
+            self._add_on(device.id, since, ts)
+
+    def _add_on(self, device, start, end):
+        # Split at hour boundaries, which are also day boundaries
+        while start < end:
+            step_end = min(end, (start // HOUR + 1) * HOUR)
+            for resolution in (HOUR, DAY):
+                self._bucket(device, resolution, start)[1] += step_end - start
+            start = step_end
+
+    def series(self, device, start, end=None, resolution=DAY):
+        # (bucket start, actions, on seconds, min, max) in [start, end), oldest first
+        buckets = self.buckets.get((device, resolution), {})
+        return [(bucket, *values) for bucket, values in sorted(buckets.items())
+                if start <= bucket and (end is None or bucket < end)]
+
+    def expire(self, now):
+        # Drops buckets past their window; returns (resolution, before) pairs
+        expired = [(HOUR, now - HOURLY_ROLLUP_WINDOW), (DAY, now - DAILY_ROLLUP_WINDOW)]
+        limits = dict(expired)
+        for (device, resolution), buckets in list(self.buckets.items()):
+            before = limits[resolution]
+            for start in [start for start in buckets if start < before]:
+                del buckets[start]
+                self._dirty.discard((device, resolution, start))
+            if not buckets:
+                del self.buckets[(device, resolution)]
+        return expired
+
+    def take_dirty(self):
+        # Rows changed since the last call, in the layout of the store's rollups table
+        rows = []
+        for device, resolution, start in self._dirty:
+            values = self.buckets.get((device, resolution), {}).get(start)
+            if values is not None:
+                rows.append((device, resolution, start, *values))
+        self._dirty.clear()
+        return rows
+
+    def rows(self):
+        # Every bucket, in the layout of take_dirty(), for snapshots
+        return [(device, resolution, start, *values)
+                for (device, resolution), buckets in self.buckets.items() for start, values in buckets.items()]
+
+    def load(self, rows, open_intervals):
+        for device, resolution, start, *values in rows:
+            self.buckets.setdefault((device, resolution), {})[start] = list(values)
+        self.open.update(open_intervals)
+
+class Retention:
+    # Background compaction of the action log. Entries older than raw_window
+    # are folded into controller.rollups, then deleted from the log store, or
+    # dropped from the in-memory log when there is no store. Without a store
+    # the in-memory log is also compacted down to half its capacity once it is
+    # three quarters full, so entries are counted before the ring would evict
+    # them however fast they are logged.
+    def __init__(self, controller, raw_window=RAW_LOG_WINDOW, interval=RETENTION_INTERVAL):
+        self.controller = controller
+        self.raw_window = raw_window
+        self.interval = interval
+        self.compacted = 0
+        self._stopped = False
+        self._wake = threading.Event()
+        self._subscription = None
+        self._thread = None
+
+    def compact(self, now=None):
+        now = time.time() if now is None else now
+        controller = self.controller
+        store = controller.log_store
+        source = controller.history
+        rollups = controller.rollups
+        cutoff = now - self.raw_window
+        excess = 0 if store is not None else len(source) - source.capacity // 2
+        compacted = 0
+        while True:
+            folded = 0
+            last_id = None
+            with controller.lock:
+                chunk = next(source.scan(chunk_size=RETENTION_CHUNK), [])
+                for row_id, ts, device, action, user in chunk:
+                    if ts >= cutoff and excess <= 0:
+                        break
+                    rollups.add(ts, device)
+                    excess -= 1
+                    folded += 1
+                    last_id = row_id
+                if store is None:
+                    if last_id is not None:
+                        source.drop_through(last_id)
+                    rollups.take_dirty()
+                elif folded:
+                    rows = rollups.take_dirty()
+                    open_intervals = list(rollups.open.items())
+            if store is not None and folded:
+                store.compact(last_id, rows, open_intervals)
+            compacted += folded
+            if folded < RETENTION_CHUNK:
+                break
+        # Also saves the on-time and values of changes since the last fold
+        with controller.lock:
+            expired = rollups.expire(now)
+            rows = rollups.take_dirty()
+            open_intervals = list(rollups.open.items())
+        if store is not None:
+            store.compact(None, rows, open_intervals, expired)
+        self.compacted += compacted
+        return compacted
+
+    def _logged(self, event):
+        # Runs under the controller lock on every append. Wakes the thread at
+        # three quarters full; if the thread has not caught up by the time the
+        # next append would evict an entry, compacts right here.
+        log = self.controller.action_log
+        if len(log) >= log.capacity:
+            self.compact()
+        elif len(log) >= log.capacity * 3 // 4:
+            self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            if self.controller.log_store is None:
+                self._subscription = self.controller.events.subscribe(ActionLogged, self._logged)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._subscription is not None:
+            self.controller.events.unsubscribe(self._subscription)
+            self._subscription = None
+        if self._thread is not None:
+            self._thread.join()  # returns once a compaction in progress is done
+
+    def _run(self):
+        while not self._stopped:
+            self.compact()
+            self._wake.wait(self.interval)
+            self._wake.clear()
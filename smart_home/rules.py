@@ -0,0 +1,115 @@
+from datetime import datetime, time
+
+from smart_home.devices import State
+
+POWER = "power"  # pseudo device id for rules on the total power draw
+RULE_MAX_DEPTH = 3  # rule actions may trigger further rules this many levels deep
+RULE_MAX_FIRINGS = 50  # rules fired for one change, across all levels
+
+def equals(expected):
+    return lambda value: value == expected
+
+def above(limit):
+    return lambda value: value > limit
+
+def below(limit):
+    return lambda value: value < limit
+
+class Rule:
+    # When `attribute` of `device_id` changes and condition(new value) holds,
+    # apply `actions`, a list of (device_id, attribute, value) changes.
+    # after/before limit the rule to a time of day; the window may wrap midnight.
+    __slots__ = ("name", "device_id", "attribute", "condition", "actions", "after", "before")
+
+    def __init__(self, name, device_id, attribute, condition, actions, after=None, before=None):
+        self.name = name
+        self.device_id = device_id
+        self.attribute = attribute
+        self.condition = condition
+        self.actions = actions
+        self.after = after
+        self.before = before
+
+    def in_window(self, now):
+        if self.after is None and self.before is None:
+            return True
+        after = self.after or time.min
+        before = self.before or time.max
+        if after <= before:
+            return after <= now < before
+        return now >= after or now < before
+
+class RuleEngine:
+    # Rules indexed by (device_id, attribute), so a change only evaluates the
+    # rules triggered by it. Firing goes through controller.apply_changes, the
+    # same batched path as scenes.
+    def __init__(self, controller, max_depth=RULE_MAX_DEPTH, max_firings=RULE_MAX_FIRINGS):
+        self.controller = controller
+        self.max_depth = max_depth
+        self.max_firings = max_firings
+        self.fired = 0
+        self.suppressed = 0  # firings skipped by the depth or firing limits
+        self.failed = 0  # firings whose actions could not be applied
+        self._index = {}
+        self._depth = 0
+        self._firings = 0
+
+    def __len__(self):
+        return sum(len(rules) for rules in self._index.values())
+
+    def add(self, rule):
+        self._index.setdefault((rule.device_id, rule.attribute), []).append(rule)
+
+    def remove(self, rule):
+        rules = self._index[(rule.device_id, rule.attribute)]
+        rules.remove(rule)
+        if not rules:
+            del self._index[(rule.device_id, rule.attribute)]
+
+    def changed(self, device_id, attribute, value):
+        rules = self._index.get((device_id, attribute))
+        if not rules:
+            return
+        if self._depth >= self.max_depth:
+            self.suppressed += len(rules)
+            return
+        now = datetime.now().time()
+        matched = [rule for rule in rules if rule.in_window(now) and rule.condition(value)]
+        self._depth += 1
+        try:
+            for rule in matched:
+                if self._firings >= self.max_firings:
+                    self.suppressed += 1
+                    continue
+                self._firings += 1
+                # A broken rule is logged, never raised into the change that triggered it
+                missing = [target for target, attribute, value in rule.actions if target not in self.controller.devices]
+                try:
+                    if missing:
+                        raise KeyError(", ".join(missing))
+                    self.controller.apply_changes(rule.actions, f"Rule: {rule.name}", user="Automation")
+                except (KeyError, ValueError) as exc:
+                    self.failed += 1
+                    self.controller.add_action("scene", f"Rule: {rule.name} failed: {exc}", "System")
+                    continue
+                self.fired += 1
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._firings = 0
+
+def default_rules(devices):
+    # The rules whose devices are all in the registry `devices`
+    def power_limit(watts):
+        return watts > 800 and devices["fan1"].value > 1
+
+    rules = [
+        Rule("Door opened at night", "door1", "state", equals(State.UNLOCKED),
+             [("light1", "state", State.ON), ("camera1", "state", State.ON)], after=time(22, 0), before=time(6, 0)),
+        Rule("Power limit", POWER, "watts", power_limit, [("fan1", "value", 1)]),
+    ]
+    return [
+        rule for rule in rules
+        if (rule.device_id == POWER or rule.device_id in devices)
+        and all(device_id in devices for device_id, attribute, value in rule.actions)
+    ]
@@ -0,0 +1,31 @@
+from smart_home.devices import DeviceType, State
+
+# Attribute and value each scene sets on every device of a type
+SCENES = {
+    "All lights off": {
+        DeviceType.LIGHT: ("state", State.OFF),
+    },
+    "Away": {
+        DeviceType.LIGHT: ("state", State.OFF),
+        DeviceType.TV: ("state", State.OFF),
+        DeviceType.DOOR: ("state", State.LOCKED),
+        DeviceType.CAMERA: ("state", State.ON),
+        DeviceType.FAN: ("value", 0),
+    },
+    "Night": {
+        DeviceType.LIGHT: ("state", State.OFF),
+        DeviceType.TV: ("state", State.OFF),
+        DeviceType.DOOR: ("state", State.LOCKED),
+        DeviceType.CAMERA: ("state", State.ON),
+        DeviceType.THERMOSTAT: ("value", 19.0),
+    },
+}
+
+def scene_changes(registry, name):
+    # (device_id, attribute, value) for every device the scene would change
+    changes = []
+    for device_type, (attribute, value) in SCENES[name].items():
+        for device_id in registry.by_type.get(device_type, ()):
+            if getattr(registry[device_id], attribute) != value:
+                changes.append((device_id, attribute, value))
+    return changes
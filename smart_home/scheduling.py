@@ -0,0 +1,84 @@
+import threading
+
+SLIDER_COMMIT_MODE = "release"  # "release" commits when the slider is let go, "window" after a quiet period
+SLIDER_COALESCE_WINDOW = 0.3  # seconds, used in "window" mode
+RENDER_INTERVAL = 1 / 60  # seconds per frame; 0 flushes on the next loop turn
+
+class SliderCoalescer:
+    # Collapses a slider drag into a single committed value. Every intermediate
+    # value goes to preview; commit runs once on release or once per quiet window.
+    def __init__(self, initial, preview, commit, mode=SLIDER_COMMIT_MODE, window=SLIDER_COALESCE_WINDOW):
+        self.preview = preview
+        self.commit = commit
+        self.mode = mode
+        self.window = window
+        self._committed = initial
+        self._pending = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def change(self, value):
+        self.preview(value)
+        with self._lock:
+            self._pending = value
+            if self.mode == "window":
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def sync(self, value):
+        # The value was changed elsewhere, e.g. by a scene
+        with self._lock:
+            self._committed = value
+
+    def release(self, value):
+        with self._lock:
+            self._pending = value
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            value, self._pending = self._pending, None
+            if value is None or value == self._committed:
+                return
+            self._committed = value
+        self.commit(value)
+
+class RenderScheduler:
+    # Handlers mark the controls they changed; one update(*dirty) per frame sends
+    # them all. coalesced counts the marks absorbed into an already pending flush.
+    def __init__(self, update, interval=RENDER_INTERVAL):
+        self.update = update
+        self.interval = interval
+        self.flushes = 0
+        self.coalesced = 0
+        self._dirty = {}  # id -> control, so each control is sent once per frame
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def mark(self, *controls):
+        with self._lock:
+            for control in controls:
+                self._dirty[id(control)] = control
+            if self._timer is not None:
+                self.coalesced += 1
+                return
+            self._timer = threading.Timer(self.interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            controls = list(self._dirty.values())
+            self._dirty.clear()
+        if controls:
+            self.update(*controls)
+            self.flushes += 1
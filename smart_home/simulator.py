@@ -0,0 +1,15 @@
+from smart_home.devices import Device, DeviceType, State
+
+def generate_building(rooms, rooms_per_floor=20):
+    # Synthetic building-scale install with five devices per room
+    devices = []
+    for i in range(rooms):
+        room = f"Floor {i // rooms_per_floor + 1} Room {i % rooms_per_floor + 1}"
+        devices += [
+            Device(f"light-{i}", f"{room} Light", DeviceType.LIGHT, room, 40, State.OFF),
+            Device(f"door-{i}", f"{room} Door", DeviceType.DOOR, room, 5, State.LOCKED),
+            Device(f"thermostat-{i}", f"{room} Thermostat", DeviceType.THERMOSTAT, room, 200, None, 22.0),
+            Device(f"fan-{i}", f"{room} Fan", DeviceType.FAN, room, 0, None, 0),
+            Device(f"camera-{i}", f"{room} Camera", DeviceType.CAMERA, room, 10, State.OFF),
+        ]
+    return devices
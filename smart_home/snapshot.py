@@ -0,0 +1,146 @@
+import atexit
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from smart_home.devices import Device, DeviceType, State
+
+SNAPSHOT_INTERVAL = 30  # seconds between background snapshots
+SNAPSHOT_LOG_TAIL = 1000  # newest action log entries kept in a snapshot
+
+MAGIC = b"SHSNAP01"
+HEADER = struct.Struct("<8sIQ")  # magic, CRC-32 of the payload, payload length
+SECTION = struct.Struct("<Q")  # length of the section that follows
+
+# File layout: header, then length-prefixed sections. The first section is
+# JSON (devices, log tail, rollup sizes, energy meter device ids, activity
+# rollups when there is no log store); then the raw sum, count and bucket
+# arrays of every power rollup, in the order of the JSON "power" list, and the
+# timestamp, device and delta arrays of the energy meter if the controller
+# has one.
+# Arrays are in native byte order, so a snapshot is read where it was written.
+
+def _sections(controller, log_tail):
+    resolutions = controller.power_series.resolutions
+    # Under the controller lock, so devices and log tail are one consistent state
+    with controller.lock:
+        meta = {
+            "devices": [
+                [device.id, device.name, int(device.type), device.room, device.power,
+                 None if device.state is None else int(device.state), device.value]
+                for device in controller.devices
+            ],
+            "log": controller.action_log.latest(log_tail),
+            "power": [[width, series.size] for width, series in resolutions.items()],
+            "energy": None if controller.energy is None else controller.energy.device_ids,
+            # Without a log store the snapshot is the only copy of the compacted activity
+            "rollups": None if controller.log_store is not None else
+                       [controller.rollups.rows(), list(controller.rollups.open.items())],
+        }
+    yield json.dumps(meta, separators=(",", ":")).encode()
+    for series in resolutions.values():
+        yield from series.dump()
+    if controller.energy is not None:
+        yield from controller.energy.dump()
+
+def save_snapshot(controller, path, log_tail=SNAPSHOT_LOG_TAIL):
+    # Written to a temporary file, synced, then renamed over `path`: a crash
+    # at any point leaves either the previous snapshot or the new one
+    payload = b"".join(SECTION.pack(len(section)) + section for section in _sections(controller, log_tail))
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, zlib.crc32(payload), len(payload)))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    if hasattr(os, "O_DIRECTORY"):
+        # Sync the directory too, so the rename itself survives a power loss
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+    return HEADER.size + len(payload)
+
+def load_snapshot(path):
+    # Devices, log tail (newest first), power rollups and energy records from a snapshot
+    # file, or None if it is missing, truncated or fails its checksum
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            with memoryview(view) as data:
+                return _parse(data)
+    except (OSError, ValueError, struct.error):
+        return None
+
+def _parse(data):
+    magic, crc, length = HEADER.unpack_from(data)
+    payload = data[HEADER.size:]
+    if magic != MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+        return None
+    sections = []
+    offset = 0
+    while offset < length:
+        size, = SECTION.unpack_from(payload, offset)
+        offset += SECTION.size
+        sections.append(payload[offset:offset + size])
+        offset += size
+    meta = json.loads(bytes(sections[0]))
+    devices = [
+        Device(device_id, name, DeviceType(device_type), room, power, None if state is None else State(state), value)
+        for device_id, name, device_type, room, power, state, value in meta["devices"]
+    ]
+    arrays = iter(sections[1:])
+    power = {width: (size, *(bytes(next(arrays)) for _ in range(3))) for width, size in meta["power"]}
+    energy = None
+    if meta.get("energy") is not None:
+        energy = (meta["energy"], *(bytes(next(arrays)) for _ in range(3)))
+    return {"devices": devices, "log": meta["log"], "power": power, "energy": energy, "rollups": meta.get("rollups")}
+
+class SnapshotWriter:
+    # Background thread snapshotting the controller every `interval` seconds
+    # while anything changed, and once more at exit
+    def __init__(self, controller, path, interval=SNAPSHOT_INTERVAL, log_tail=SNAPSHOT_LOG_TAIL):
+        self.controller = controller
+        self.path = path
+        self.interval = interval
+        self.log_tail = log_tail
+        self.written = 0
+        self._saved = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _state(self):
+        controller = self.controller
+        return controller.action_log.total, controller.changes, controller.power_series.samples
+
+    def write(self, force=False):
+        with self._lock:
+            state = self._state()
+            if state == self._saved and not force:
+                return False
+            save_snapshot(self.controller, self.path, self.log_tail)
+            self._saved = state
+            self.written += 1
+            return True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.write)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()  # returns once a snapshot being written is in place
+        atexit.unregister(self.write)
+        self.write()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
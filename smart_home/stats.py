@@ -0,0 +1,6 @@
+def percentile(values, share):
+    # Nearest-rank percentile of a list of samples, 0.0 when there are none
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
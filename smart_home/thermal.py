@@ -0,0 +1,158 @@
+import json
+import time
+
+import numpy as np
+
+from smart_home.devices import DeviceType
+from smart_home.power_series import DAY, HOUR, POWER_SAMPLE_INTERVAL
+
+THERMAL_STEP = 10.0  # simulated seconds per step
+ROOM_CAPACITY = 5e5  # J/K of a room's air, furniture and inner walls
+ROOM_CONDUCTANCE = 40.0  # W/K lost to the outdoors through walls and windows
+FAN_CONDUCTANCE = 15.0  # W/K of extra outdoor air exchanged per fan speed step
+HEAT_PUMP_COP = 3.0  # watts of heat moved per watt a thermostat draws
+THERMOSTAT_BAND = 0.5  # °C either side of the setpoint before heating or cooling starts
+OUTDOOR_MEAN = 10.0  # °C
+OUTDOOR_SWING = 6.0  # °C above and below the mean over a day
+
+def outdoor_temperature(ts, mean=OUTDOOR_MEAN, swing=OUTDOOR_SWING):
+    # Daily cycle, coldest at 05:00 and warmest at 17:00 UTC; ts may be an array
+    return mean - swing * np.cos(2 * np.pi * (ts % DAY - 5 * HOUR) / DAY)
+
+class ThermalSimulator:
+    # Fixed-step thermal model of every room of the controller's devices. A
+    # room has one temperature and loses heat to the outdoors through its
+    # walls and, per fan speed step, through the air its fans move. Its
+    # thermostats run a heat pump at their rated power, heating below and
+    # cooling above the setpoint band until the setpoint is reached, and every
+    # other device's power ends up as heat in its room:
+    #   C dT/dt = (G + G_fan * fan speed) (T_out - T) + COP * P_pump + P_devices
+    # All rooms advance in one NumPy update per step (explicit Euler; stable
+    # while the step is far below C / G, about three hours).
+    def __init__(self, controller, temperature=20.0):
+        self.controller = controller
+        devices = controller.devices
+        self.rooms = list(devices.by_room)
+        room_index = {room: i for i, room in enumerate(self.rooms)}
+        self.thermostat_ids = list(devices.select(device_type=DeviceType.THERMOSTAT))
+        self.fan_ids = list(devices.select(device_type=DeviceType.FAN))
+        self._other_ids = [device.id for device in devices if device.type != DeviceType.THERMOSTAT]
+
+        def rooms_of(device_ids):
+            return np.array([room_index[devices[device_id].room] for device_id in device_ids], dtype=np.intp)
+
+        self._thermostat_room = rooms_of(self.thermostat_ids)
+        self._fan_room = rooms_of(self.fan_ids)
+        self._other_room = rooms_of(self._other_ids)
+        self._rated = np.array([devices[device_id].power for device_id in self.thermostat_ids], dtype=float)
+        self.temperatures = np.full(len(self.rooms), temperature)
+        self.modes = np.zeros(len(self.thermostat_ids), dtype=np.int8)  # 1 heating, -1 cooling, 0 idle
+        self.read_controls()
+
+    def read_controls(self):
+        # Setpoints, fan speeds and the power of the other devices, from the controller
+        with self.controller.lock:
+            devices = self.controller.devices
+            self.setpoints = np.array([devices[device_id].value for device_id in self.thermostat_ids], dtype=float)
+            fans = np.array([devices[device_id].value for device_id in self.fan_ids], dtype=float)
+            draws = np.array([devices[device_id].draw() for device_id in self._other_ids], dtype=float)
+        rooms = len(self.rooms)
+        self._exchange = ROOM_CONDUCTANCE + FAN_CONDUCTANCE * np.bincount(self._fan_room, weights=fans, minlength=rooms)
+        self._gains = np.bincount(self._other_room, weights=draws, minlength=rooms)
+        self.base_watts = float(draws.sum())  # everything but the thermostats
+
+    def step(self, dt, outdoor):
+        # Advances every room by dt seconds at outdoor temperature `outdoor`;
+        # returns the positions in thermostat_ids of thermostats that switched
+        error = self.setpoints - self.temperatures[self._thermostat_room]
+        modes = np.where(error > THERMOSTAT_BAND, 1, np.where(error < -THERMOSTAT_BAND, -1, self.modes))
+        modes[(modes == 1) & (error <= 0) | (modes == -1) & (error >= 0)] = 0
+        switched = np.flatnonzero(modes != self.modes)
+        self.modes = modes.astype(np.int8)
+        pumped = np.bincount(self._thermostat_room, weights=self.modes * self._rated * HEAT_PUMP_COP,
+                             minlength=len(self.rooms))
+        self.temperatures += dt / ROOM_CAPACITY * (
+            self._exchange * (outdoor - self.temperatures) + pumped + self._gains)
+        return switched
+
+    def thermostat_watts(self):
+        return np.abs(self.modes) * self._rated
+
+    def run(self, duration, start=None, dt=THERMAL_STEP, outdoor=outdoor_temperature, power_series=None, energy=None):
+        # Simulates `duration` seconds as fast as it can, from `start` (by
+        # default so that the run ends now). Controls are read once, at the
+        # start. Total power goes to power_series every POWER_SAMPLE_INTERVAL
+        # simulated seconds, and thermostat switches to the EnergyMeter
+        # `energy`, both at simulated times. Thermostats then go back to their
+        # rated draw in the meter, which is what Device.draw() reports.
+        start = time.time() - duration if start is None else start
+        steps = int(round(duration / dt))
+        times = start + dt * np.arange(steps)
+        outdoors = outdoor(times) if callable(outdoor) else np.full(steps, float(outdoor))
+        self.read_controls()
+        meter_index = None if energy is None else energy.indexes(self.thermostat_ids)
+        if energy is not None:
+            energy.record_many(start, meter_index, self.thermostat_watts())
+        low = high = self.temperatures.copy()
+        thermostat_joules = 0.0
+        next_sample = start
+        began = time.perf_counter()
+        for ts, temperature in zip(times.tolist(), outdoors.tolist()):
+            switched = self.step(dt, temperature)
+            watts = self.thermostat_watts()
+            if energy is not None and len(switched):
+                energy.record_many(ts, meter_index[switched], watts[switched])
+            pump_watts = float(watts.sum())
+            thermostat_joules += pump_watts * dt
+            if power_series is not None and ts >= next_sample:
+                power_series.add(ts, self.base_watts + pump_watts)
+                next_sample = ts + POWER_SAMPLE_INTERVAL
+            low = np.minimum(low, self.temperatures)
+            high = np.maximum(high, self.temperatures)
+        elapsed = time.perf_counter() - began
+        if energy is not None:
+            energy.record_many(start + steps * dt, meter_index, self._rated)
+        return {
+            "rooms": len(self.rooms),
+            "steps": steps,
+            "simulated_seconds": steps * dt,
+            "seconds": elapsed,
+            "speedup": steps * dt / elapsed if elapsed else None,  # simulated seconds per wall-clock second
+            "thermostat_kwh": thermostat_joules / 3.6e6,
+            "min_temperature": float(low.min(initial=np.inf)),
+            "mean_temperature": float(self.temperatures.mean()) if len(self.rooms) else None,
+            "max_temperature": float(high.max(initial=-np.inf)),
+        }
+
+if __name__ == "__main__":
+    import argparse
+
+    from smart_home.controller import SmartHomeController
+    from smart_home.energy import EnergyMeter
+    from smart_home.simulator import generate_building
+
+    parser = argparse.ArgumentParser(description="Simulate room temperatures and thermostat power, faster than real time")
+    parser.add_argument("--rooms", type=int, default=0, help="generated building size; 0 uses the default devices")
+    parser.add_argument("--hours", type=float, default=24.0, help="simulated hours")
+    parser.add_argument("--step", type=float, default=THERMAL_STEP, help="simulated seconds per step")
+    parser.add_argument("--setpoint", type=float, help="thermostat setpoint for every room")
+    parser.add_argument("--fan-speed", type=int, help="speed of every fan, 0 to 3")
+    parser.add_argument("--outdoor-mean", type=float, default=OUTDOOR_MEAN)
+    parser.add_argument("--outdoor-swing", type=float, default=OUTDOOR_SWING)
+    args = parser.parse_args()
+
+    controller = SmartHomeController(devices=generate_building(args.rooms) if args.rooms else None)
+    for device in controller.devices:
+        if device.type == DeviceType.THERMOSTAT and args.setpoint is not None:
+            controller.set_value(device.id, args.setpoint)
+        elif device.type == DeviceType.FAN and args.fan_speed is not None:
+            controller.set_value(device.id, args.fan_speed)
+    duration = args.hours * HOUR
+    start = time.time() - duration
+    meter = EnergyMeter(controller)
+    meter.start(start)
+    report = ThermalSimulator(controller).run(
+        duration, start, args.step, lambda ts: outdoor_temperature(ts, args.outdoor_mean, args.outdoor_swing),
+        controller.power_series, meter)
+    report["home_kwh"] = meter.total(start, start + duration)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,42 @@
+import pytest
+
+from smart_home import ActionLog
+
+def logged(i):
+    return {"timestamp": float(i), "device": f"d{i % 3}", "action": str(i), "user": "User"}
+
+def test_ring_evicts_oldest_and_keeps_device_index():
+    log = ActionLog(capacity=4)
+    for i in range(10):
+        log.append(logged(i))
+    assert len(log) == 4
+    assert [entry["action"] for entry in log] == ["9", "8", "7", "6"]
+    assert [entry["action"] for entry in log.latest(2)] == ["9", "8"]
+    assert [entry["action"] for entry in log.for_device("d0", 5)] == ["9", "6"]
+    assert [entry["action"] for entry in log.for_device("d1", 5)] == ["7"]
+    assert [entry["action"] for entry in log.for_device("d2", 5)] == ["8"]
+
+def test_device_index_drops_devices_with_no_entries_left():
+    log = ActionLog(capacity=2)
+    log.append(logged(0))
+    log.append(logged(1))
+    log.append(logged(2))
+    assert log.for_device("d0", 5) == []
+    assert [entry["action"] for entry in log.for_device("d2", 5)] == ["2"]
+
+def test_between_finds_time_ranges_and_covers_knows_what_was_evicted():
+    log = ActionLog(capacity=5)
+    for i in range(8):
+        log.append(logged(i))
+    assert [entry["action"] for entry in log.between(4.0, 6.0)] == ["5", "4"]
+    assert [entry["action"] for entry in log.between(6.5)] == ["7"]
+    assert log.between(0.0, 2.0) == []
+    assert log.covers(3.0)
+    assert not log.covers(2.0)
+
+def test_page_rejects_non_positive_limits():
+    log = ActionLog(capacity=4)
+    log.append(logged(0))
+    with pytest.raises(ValueError):
+        log.page(0)
+    assert log.page(1) == ([logged(0)], None)
@@ -0,0 +1,113 @@
+from concurrent.futures import Future
+
+import pytest
+
+from smart_home import SCENES, Rule, SmartHomeController, State, equals
+
+class RejectingDispatcher:
+    # Hardware that refuses every batch, to exercise rollback
+    def __init__(self):
+        self.batches = []
+
+    def submit(self, device_id, attribute, value):
+        pass
+
+    def submit_batch(self, commands):
+        self.batches.append(commands)
+        future = Future()
+        future.set_exception(ConnectionError("device offline"))
+        return future
+
+class PendingDispatcher(RejectingDispatcher):
+    # Hardware whose batches stay pending until the test fails them
+    def __init__(self):
+        super().__init__()
+        self.futures = []
+
+    def submit_batch(self, commands):
+        self.batches.append(commands)
+        self.futures.append(Future())
+        return self.futures[-1]
+
+def snapshot(controller):
+    return {device.id: (device.state, device.value) for device in controller.devices}
+
+def test_totals_follow_toggles_and_values():
+    controller = SmartHomeController()
+    assert controller.check_totals()
+    for device_id in ("light1", "tv1", "door1", "light1"):
+        controller.toggle(device_id)
+    controller.set_value("fan1", 3)
+    controller.set_value("thermostat1", 25.0)
+    assert controller.check_totals()
+    assert controller.get_current_power() == 5 + 200 + 150 + 150  # door2 locked, thermostat, TV, fan at 3
+    assert controller.active_devices == 3  # TV, front door, fan
+
+def test_totals_follow_scenes():
+    controller = SmartHomeController()
+    controller.toggle("light1")
+    controller.toggle("door1")
+    controller.set_value("fan1", 2)
+    for name in SCENES:
+        controller.apply_scene(name)
+        assert controller.check_totals()
+    assert [controller.devices[device_id].state for device_id in ("light1", "door1", "camera1")] == [
+        State.OFF, State.LOCKED, State.ON]
+    assert controller.devices["fan1"].value == 0
+
+def test_invalid_change_reverts_the_whole_batch():
+    controller = SmartHomeController()
+    before = snapshot(controller)
+    with pytest.raises(KeyError):
+        controller.apply_changes([("light1", "state", State.ON), ("nope", "state", State.ON)], "Test")
+    assert snapshot(controller) == before
+    assert controller.check_totals()
+
+def test_rejected_batch_is_rolled_back():
+    controller = SmartHomeController()
+    before = snapshot(controller)
+    controller.dispatcher = RejectingDispatcher()
+    controller.apply_changes([("light1", "state", State.ON), ("fan1", "value", 3)], "Test")
+    assert snapshot(controller) == before
+    assert controller.check_totals()
+    assert "rolled back" in controller.action_log.latest(1)[0]["action"]
+    assert len(controller.dispatcher.batches) == 2  # the batch, then the compensating commands
+
+def test_late_rollback_keeps_newer_changes():
+    controller = SmartHomeController()
+    controller.set_value("fan1", 3)
+    controller.toggle("light1")
+    dispatcher = controller.dispatcher = PendingDispatcher()
+    controller.apply_scene("Away")
+    assert controller.devices["fan1"].value == 0
+    # The scene's batch fails only after the user changed the fan again
+    controller.set_value("fan1", 2)
+    dispatcher.futures[0].set_exception(ConnectionError("device offline"))
+    assert controller.devices["fan1"].value == 2
+    assert controller.devices["light1"].state == State.ON
+    assert ("fan1", "value", 3) not in dispatcher.batches[1]
+    assert ("light1", "state", "ON") in dispatcher.batches[1]
+    assert controller.check_totals()
+
+def test_rules_run_before_an_immediate_rollback():
+    controller = SmartHomeController()
+    controller.rules.add(Rule("follow", "light1", "state", equals(State.ON), [("light2", "state", State.ON)]))
+    controller.dispatcher = RejectingDispatcher()
+    controller.apply_changes([("light1", "state", State.ON)], "Test")
+    assert controller.rules.fired == 1
+    actions = [entry["action"] for entry in controller.action_log.latest(4)]
+    assert actions[0].startswith("Test rolled back")
+    assert actions[1].startswith("Rule: follow rolled back")
+    assert controller.devices["light1"].state == State.OFF
+    assert controller.devices["light2"].state == State.OFF
+    assert controller.check_totals()
+
+def test_batch_rejects_states_of_another_device_type():
+    controller = SmartHomeController()
+    with pytest.raises(ValueError):
+        controller.apply_changes([("door1", "state", State.ON)], "Test")
+    with pytest.raises(ValueError):
+        controller.apply_changes([("light1", "state", State.UNLOCKED)], "Test")
+    assert controller.devices["door1"].state == State.LOCKED
+    assert controller.devices["light1"].state == State.OFF
+    assert controller.check_totals()
@@ -0,0 +1,24 @@
+import pytest
+
+from smart_home import Histogram, Instrumentation
+
+def test_percentile_is_the_upper_bound_of_its_bucket():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0.0
+    for _ in range(99):
+        histogram.add(10e-6)  # bucket below 16 us
+    histogram.add(1e-3)  # bucket below 1024 us, capped at the largest sample
+    assert histogram.percentile(0.50) == pytest.approx(16e-6)
+    assert histogram.percentile(0.99) == pytest.approx(16e-6)
+    assert histogram.percentile(1.0) == pytest.approx(1e-3)
+    assert histogram.to_dict()["buckets_us"] == {16: 99, 1024: 1}
+
+def test_timed_records_only_while_enabled():
+    instrumentation = Instrumentation()
+    handler = instrumentation.timed("click", lambda e: e * 2)
+    assert handler(2) == 4
+    assert instrumentation.histograms == {}
+    instrumentation.enabled = True
+    assert handler(3) == 6
+    assert instrumentation.histograms["click"].count == 1
+    assert instrumentation.snapshot()["handlers"]["click"]["count"] == 1
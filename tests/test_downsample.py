@@ -0,0 +1,19 @@
+from smart_home import lttb, min_max
+
+def test_lttb_keeps_the_ends_and_the_spikes():
+    values = [0.0] * 1000
+    values[137] = 500.0
+    values[862] = -300.0
+    values[-1] = 7.0
+    sampled = lttb(values, 50)
+    assert len(sampled) == 50
+    assert sampled[0] == 0.0 and sampled[-1] == 7.0
+    assert 500.0 in sampled and -300.0 in sampled
+
+def test_lttb_returns_short_series_unchanged():
+    assert lttb([1.0, 2.0, 3.0], 10) == [1.0, 2.0, 3.0]
+    assert lttb([1.0, 2.0, 3.0, 4.0], 2) == [1.0, 2.0, 3.0, 4.0]
+
+def test_min_max_per_slice():
+    assert min_max([3, 1, 4, 1, 5, 9, 2, 6], 4) == [(1, 3), (1, 4), (5, 9), (2, 6)]
+    assert min_max([3, 1], 4) == [(3, 3), (1, 1)]
@@ -0,0 +1,66 @@
+import asyncio
+import socket
+
+import pytest
+
+from smart_home.drivers import DriverDispatcher, DriverError, SimulatedDeviceServer, TcpDriver
+
+def simulated(on_error=None, **server_options):
+    # Dispatcher wired to a local simulated server on its own loop
+    dispatcher = DriverDispatcher(None, on_error)
+    server = dispatcher.run(SimulatedDeviceServer(**server_options).start())
+    dispatcher.driver = TcpDriver(server.host, server.port, pool_size=4, timeout=1.0)
+    return dispatcher, server
+
+def close(dispatcher, server):
+    dispatcher.run(server.stop())
+    dispatcher.close()
+
+def test_commands_reach_the_device_server():
+    dispatcher, server = simulated(latency=0.001, jitter=0.001)
+    try:
+        futures = [dispatcher.submit(f"light{i}", "state", "ON") for i in range(20)]
+        assert all(future.result(5)["ok"] for future in futures)
+        assert server.states == {(f"light{i}", "state"): "ON" for i in range(20)}
+        assert dispatcher.sent == 20
+        assert len(dispatcher.latencies) == 20
+    finally:
+        close(dispatcher, server)
+
+def test_commands_for_one_device_arrive_in_order():
+    # With jitter, concurrent commands for one device would overtake each other
+    dispatcher, server = simulated(latency=0.001, jitter=0.01)
+    try:
+        for _ in range(10):
+            futures = []
+            for i in range(8):
+                for device_id in ("light1", "light2"):
+                    futures.append(dispatcher.submit(device_id, "state", "ON" if i % 2 == 0 else "OFF"))
+            futures.append(dispatcher.submit_batch([("light1", "state", "ON"), ("light2", "state", "OFF")]))
+            futures.append(dispatcher.submit("light1", "state", "OFF"))
+            for future in futures:
+                future.result(5)
+            assert server.states[("light1", "state")] == "OFF"
+            assert server.states[("light2", "state")] == "OFF"
+    finally:
+        close(dispatcher, server)
+
+def test_device_errors_are_reported_and_not_retried():
+    errors = []
+    dispatcher, server = simulated(lambda *args: errors.append(args), latency=0, jitter=0, failure_rate=1.0)
+    try:
+        with pytest.raises(DriverError):
+            dispatcher.submit("light1", "state", "ON").result(5)
+        assert server.handled == 1
+        assert dispatcher.failed == 1
+        assert errors[0][:3] == ("light1", "state", "ON")
+    finally:
+        close(dispatcher, server)
+
+def test_refused_connections_are_retried_and_reported():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # closed again, so connecting is refused
+    driver = TcpDriver("127.0.0.1", port, retries=2, backoff=0.001)
+    with pytest.raises(DriverError, match="3 attempts"):
+        asyncio.run(driver.send("light1", "state", "ON"))
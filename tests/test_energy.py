@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pytest
+
+from smart_home import HOUR, SmartHomeController, save_snapshot
+from smart_home.energy import EnergyMeter
+
+def test_kwh_follows_the_power_steps():
+    meter = EnergyMeter(SmartHomeController())
+    meter.record(0.0, "light1", 60)
+    meter.record(HOUR, "light1", 0)
+    meter.record(2 * HOUR, "light1", 60)
+    assert meter.by_device(0.0, 3 * HOUR)["light1"] == pytest.approx(0.12)
+    assert meter.by_device(HOUR / 2, 2.5 * HOUR)["light1"] == pytest.approx(0.06)
+    days, kwh = meter.table(0.0, 3 * HOUR, width=HOUR)
+    assert days.tolist() == [0.0, HOUR, 2 * HOUR]
+    assert kwh[meter.device_ids.index("light1")].tolist() == pytest.approx([0.06, 0.0, 0.06])
+    assert meter.by_room(0.0, 3 * HOUR)["Living Room"] == pytest.approx(0.12)
+
+def test_joules_match_a_step_by_step_integral():
+    meter = EnergyMeter(SmartHomeController())
+    rng = random.Random(3)
+    steps = {device_id: [(0.0, 0.0)] for device_id in meter.device_ids}
+    ts = 0.0
+    for _ in range(500):
+        ts += rng.expovariate(1 / 60)
+        device_id = rng.choice(meter.device_ids)
+        watts = rng.choice([0, 5, 60, 150, 200])
+        meter.record(ts, device_id, watts)
+        steps[device_id].append((ts, watts))
+
+    def joules(device_id, start, end):
+        total = 0.0
+        changes = steps[device_id] + [(float("inf"), 0.0)]
+        for (since, watts), (until, _) in zip(changes, changes[1:]):
+            total += watts * max(0.0, min(until, end) - max(since, start))
+        return total
+
+    times = np.sort(np.array([rng.uniform(0, ts) for _ in range(12)]))
+    result = meter._joules(times)
+    for i, device_id in enumerate(meter.device_ids):
+        expected = [joules(device_id, times[0], t) for t in times]
+        assert result[i] == pytest.approx(expected, rel=1e-9, abs=1e-6)
+
+def test_meter_survives_a_snapshot(tmp_path):
+    path = str(tmp_path / "state.bin")
+    controller = SmartHomeController()
+    controller.energy = EnergyMeter(controller)
+    controller.energy.record(0.0, "tv1", 150)
+    controller.energy.record(HOUR, "tv1", 0)
+    save_snapshot(controller, path)
+    restored = SmartHomeController(snapshot_path=path)
+    meter = EnergyMeter(restored)
+    assert meter.by_device(0.0, 2 * HOUR)["tv1"] == pytest.approx(0.15)
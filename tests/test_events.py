@@ -0,0 +1,40 @@
+from smart_home import ActionLogged, DeviceChanged, EventBus, SmartHomeController, TotalsChanged
+
+def test_device_events_reach_their_device_and_catch_all_handlers_only():
+    bus = EventBus()
+    light, fan, every = [], [], []
+    bus.subscribe(DeviceChanged, light.append, device_id="light1")
+    bus.subscribe(DeviceChanged, fan.append, device_id="fan1")
+    bus.subscribe(DeviceChanged, every.append)
+    bus.publish(DeviceChanged("light1", "state", 1))
+    bus.publish(DeviceChanged("tv1", "state", 1))
+    assert [event.device_id for event in light] == ["light1"]
+    assert fan == []
+    assert [event.device_id for event in every] == ["light1", "tv1"]
+
+def test_unsubscribe_during_delivery():
+    bus = EventBus()
+    seen = []
+
+    def once(event):
+        seen.append(event)
+        bus.unsubscribe(subscription)
+
+    subscription = bus.subscribe(TotalsChanged, once)
+    bus.subscribe(TotalsChanged, seen.append)
+    bus.publish(TotalsChanged(0, 0))
+    bus.publish(TotalsChanged(0, 0))
+    assert len(seen) == 3
+    assert len(bus) == 1
+
+def test_controller_publishes_changes_totals_and_log_entries():
+    controller = SmartHomeController()
+    changed, totals, logged = [], [], []
+    controller.events.subscribe(DeviceChanged, changed.append, device_id="light1")
+    controller.events.subscribe(TotalsChanged, totals.append)
+    controller.events.subscribe(ActionLogged, logged.append)
+    controller.toggle("light1")
+    controller.toggle("tv1")
+    assert [(event.attribute, event.value) for event in changed] == [("state", 1)]
+    assert totals[-1].total_power == controller.get_current_power()
+    assert [event.entry["device"] for event in logged] == ["light1", "tv1"]
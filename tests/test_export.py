@@ -0,0 +1,65 @@
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+from smart_home import SmartHomeController
+from smart_home.export import EXPORT_COLUMNS, export_actions
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+def test_checkpoint_exports_only_new_rows(tmp_path):
+    controller = SmartHomeController(log_path=str(tmp_path / "actions.db"))
+    checkpoint = str(tmp_path / "export.json")
+    for i in range(30):
+        controller.add_action("light1", "Turn ON")
+    assert export_actions(controller.log_store, str(tmp_path / "a.csv"), checkpoint=checkpoint) == 30
+    assert export_actions(controller.log_store, str(tmp_path / "b.csv"), checkpoint=checkpoint) == 0
+    for i in range(5):
+        controller.add_action("light1", "Turn OFF")
+    assert export_actions(controller.log_store, str(tmp_path / "c.csv"), checkpoint=checkpoint) == 5
+    rows = read_csv(tmp_path / "c.csv")
+    assert tuple(rows[0]) == EXPORT_COLUMNS
+    assert [row[4] for row in rows[1:]] == ["Turn OFF"] * 5
+    controller.close()
+
+def test_filters_and_small_chunks_keep_the_order(tmp_path):
+    controller = SmartHomeController(log_path=str(tmp_path / "actions.db"))
+    for i in range(20):
+        controller.add_action(f"light{i % 2}", str(i))
+    output = str(tmp_path / "light1.csv")
+    assert export_actions(controller.log_store, output, chunk_size=3, device="light1") == 10
+    assert [row[4] for row in read_csv(output)[1:]] == [str(i) for i in range(1, 20, 2)]
+    controller.close()
+
+def test_in_memory_buffer_exports_too(tmp_path):
+    controller = SmartHomeController()
+    for i in range(7):
+        controller.add_action("tv1", str(i))
+    output = str(tmp_path / "buffer.csv")
+    assert export_actions(controller.action_log, output, chunk_size=2) == 7
+    assert [row[4] for row in read_csv(output)[1:]] == [str(i) for i in range(7)]
+
+def test_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    controller = SmartHomeController(log_path=str(tmp_path / "actions.db"))
+    for i in range(12):
+        controller.add_action("fan1", str(i))
+    output = str(tmp_path / "actions.parquet")
+    assert export_actions(controller.log_store, output, "parquet", chunk_size=5) == 12
+    table = pq.read_table(output)
+    assert table.column_names == list(EXPORT_COLUMNS)
+    assert table.column("action").to_pylist() == [str(i) for i in range(12)]
+    controller.close()
+
+def test_cli_refuses_a_missing_log(tmp_path):
+    path = str(tmp_path / "typo.db")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    done = subprocess.run([sys.executable, "-m", "smart_home.export", path], cwd=root, capture_output=True, text=True)
+    assert done.returncode == 2
+    assert "no such file" in done.stderr
+    assert not os.path.exists(path)
@@ -0,0 +1,31 @@
+from smart_home import SmartHomeController, State
+from smart_home.loadgen import poisson_events, run_load, trace_events
+
+def test_poisson_traffic_keeps_totals_consistent():
+    controller = SmartHomeController()
+    events = list(poisson_events(controller.devices, rate=1000, duration=1, seed=7))
+    assert 800 < len(events) < 1200
+    assert all(0 <= offset < 1 for offset, *rest in events)
+    report = run_load(controller, events, sessions=2)
+    assert report["events"] == len(events)
+    assert report["skipped"] == 0
+    assert report["totals_consistent"]
+
+def test_trace_replay_recreates_the_recorded_state():
+    recorded = SmartHomeController()
+    recorded.toggle("light1")
+    recorded.toggle("door1")
+    recorded.apply_scene("Away")
+    recorded.toggle("tv1")
+    recorded.add_action("fan1", "Set speed to 2")
+    recorded.set_value("fan1", 2)
+    entries = list(reversed(recorded.action_log.latest(100)))
+
+    events = list(trace_events(entries))
+    assert [kind for offset, kind, *rest in events] == ["state", "state", "scene", "state", "value"]
+    replayed = SmartHomeController()
+    report = run_load(replayed, events)
+    assert report["totals_consistent"]
+    for device in recorded.devices:
+        assert (replayed.devices[device.id].state, replayed.devices[device.id].value) == (device.state, device.value)
+    assert replayed.devices["door1"].state == State.LOCKED
@@ -0,0 +1,74 @@
+import pytest
+
+from smart_home import LogStore, SmartHomeController
+
+def logged(i):
+    return {"timestamp": float(i), "device": f"light{i % 2}", "action": str(i), "user": "User" if i % 3 else "Automation"}
+
+def test_pages_cover_the_log_once(tmp_path):
+    store = LogStore(str(tmp_path / "actions.db"))
+    for i in range(25):
+        store.append(logged(i))
+    seen = []
+    cursor = None
+    while True:
+        entries, cursor = store.page(10, cursor)
+        seen += [entry["action"] for entry in entries]
+        if cursor is None:
+            break
+    assert seen == [str(i) for i in range(24, -1, -1)]
+    assert [entry["action"] for entry in store.page(3, device="light1")[0]] == ["23", "21", "19"]
+    assert [entry["action"] for entry in store.page(3, user="Automation")[0]] == ["24", "21", "18"]
+    with pytest.raises(ValueError):
+        store.page(0)
+    assert store.latest(0) == []
+    store.close()
+
+def test_between_uses_the_timestamp_range(tmp_path):
+    store = LogStore(str(tmp_path / "actions.db"))
+    for i in range(25):
+        store.append(logged(i))
+    assert [entry["action"] for entry in store.between(20.0)] == ["24", "23", "22", "21", "20"]
+    assert [entry["action"] for entry in store.between(3.0, 5.0)] == ["4", "3"]
+    assert [entry["action"] for entry in store.page(10, start=10.0, end=12.0)[0]] == ["11", "10"]
+    store.close()
+
+def test_ranges_older_than_the_buffer_come_from_the_store(tmp_path):
+    controller = SmartHomeController(log_capacity=10, log_path=str(tmp_path / "actions.db"))
+    for i in range(30):
+        controller.add_action(f"light{i % 3}", "Turn ON")
+    first = controller.log_store.latest(30)[-1]["timestamp"]
+    assert len(controller.actions_between(first)) == 30
+    newest = controller.action_log.latest(10)
+    assert controller.actions_between(newest[-1]["timestamp"]) == newest
+    controller.close()
+
+def test_store_survives_restart(tmp_path):
+    path = str(tmp_path / "actions.db")
+    controller = SmartHomeController(log_capacity=10, log_path=path)
+    for i in range(30):
+        controller.add_action(f"light{i % 3}", "Turn ON")
+    newest = controller.action_log.latest(10)
+    controller.close()
+
+    controller = SmartHomeController(log_capacity=10, log_path=path)
+    assert len(controller.log_store) == 30
+    assert controller.action_log.latest(10) == newest
+    assert len(controller.history.page(100)[0]) == 30
+    controller.close()
+
+def test_seeded_buffer_sends_older_ranges_to_the_store(tmp_path):
+    path = str(tmp_path / "actions.db")
+    controller = SmartHomeController(log_capacity=10, log_path=path)
+    for i in range(30):
+        controller.add_action(f"light{i % 3}", "Turn ON")
+    first = controller.log_store.latest(30)[-1]["timestamp"]
+    controller.close()
+
+    controller = SmartHomeController(log_capacity=20, log_path=path)
+    assert len(controller.action_log) == 20
+    assert len(controller.actions_between(0)) == 30
+    assert len(controller.actions_between(first)) == 30
+    newest = controller.action_log.latest(20)
+    assert controller.actions_between(newest[-1]["timestamp"]) == newest
+    controller.close()
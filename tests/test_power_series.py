@@ -0,0 +1,21 @@
+from smart_home import DAY, HOUR, MINUTE, PowerSeries, RollingSeries
+
+def test_buckets_average_their_samples_and_are_reused_after_a_lap():
+    series = RollingSeries(MINUTE, 3)
+    series.add(0, 100.0)
+    series.add(30, 200.0)
+    series.add(2 * MINUTE, 50.0)
+    assert series.window(0, 3 * MINUTE) == [150.0, None, 50.0]
+    series.add(3 * MINUTE + 1, 10.0)  # same slot as the first minute
+    assert series.window(MINUTE, 4 * MINUTE) == [None, 50.0, 10.0]
+    assert series.window(0, MINUTE) == [None]
+
+def test_window_picks_the_finest_resolution_that_covers_it():
+    power = PowerSeries(minutes=60, hours=48)
+    now = 10 * DAY
+    for ts in range(int(now - 2 * HOUR), int(now), MINUTE):
+        power.add(ts, 100.0)
+    assert len(power.window(now - HOUR, now)) == 60
+    assert len(power.window(now - 2 * HOUR, now)) == 2  # beyond the minute ring, so hours
+    assert len(power.window(now - HOUR, now, max_points=10)) == 1
+    assert power.last(3, HOUR, now) == [100.0, 100.0, None]
@@ -0,0 +1,99 @@
+import time
+
+from smart_home import (DAY, DEFAULT_DEVICES, HOUR, ActivityRollups, Device, Retention, SmartHomeController, State,
+                        save_snapshot)
+from smart_home.export import export_actions
+
+def test_rollups_count_actions_and_on_time():
+    rollups = ActivityRollups()
+    light, fan = (Device(*spec) for spec in DEFAULT_DEVICES if spec[0] in ("light1", "fan1"))
+    start = 100 * DAY
+    rollups.add(start + 10 * HOUR, "light1")
+    light.state = State.ON
+    rollups.changed(start + 10 * HOUR, light)
+    rollups.add(start + 12 * HOUR + 1800, "light1")
+    light.state = State.OFF
+    rollups.changed(start + 12 * HOUR + 1800, light)
+    for hour, speed in ((13, 2), (14, 0)):
+        fan.value = speed
+        rollups.changed(start + hour * HOUR, fan)
+    (day, actions, on_seconds, low, high), = rollups.series("light1", start)
+    assert (day, actions, on_seconds, low, high) == (start, 2, 2.5 * HOUR, None, None)
+    assert [row[2] for row in rollups.series("light1", start, resolution=HOUR)] == [HOUR, HOUR, 1800]
+    assert rollups.series("fan1", start)[0][2:] == (HOUR, 0, 2)
+
+def test_scenes_close_on_intervals(monkeypatch):
+    start = 100 * DAY
+    clock = [start]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    controller = SmartHomeController()
+    for hour, change in ((1, "light1"), (2, "All lights off"), (10, "light1"), (11, "light1")):
+        clock[0] = start + hour * HOUR
+        if change in controller.devices:
+            controller.toggle(change)
+        else:
+            controller.apply_scene(change)
+    assert controller.activity("light1", start)[0][2] == 2 * HOUR
+    assert "light1" not in controller.rollups.open
+
+def test_on_time_is_saved_before_its_actions_are_compacted(tmp_path):
+    path = str(tmp_path / "actions.db")
+    controller = SmartHomeController(log_path=path)
+    controller.toggle("light1")
+    controller.toggle("light1")
+    controller.toggle("tv1")
+    assert Retention(controller).compact() == 0
+    controller.close()
+    reopened = SmartHomeController(log_path=path)
+    assert sum(row[2] for row in reopened.activity("light1", 0)) > 0
+    assert "tv1" in reopened.rollups.open
+    reopened.close()
+
+def test_compaction_with_store_keeps_ids_growing(tmp_path):
+    controller = SmartHomeController(log_path=str(tmp_path / "actions.db"))
+    checkpoint = str(tmp_path / "export.json")
+    for i in range(30):
+        controller.add_action("light1", "Turn ON" if i % 2 == 0 else "Turn OFF")
+    assert export_actions(controller.log_store, str(tmp_path / "a.csv"), checkpoint=checkpoint) == 30
+    assert Retention(controller, raw_window=-DAY).compact() == 30
+    assert len(controller.log_store) == 0
+    for i in range(5):
+        controller.add_action("light1", "Turn ON")
+    assert export_actions(controller.log_store, str(tmp_path / "b.csv"), checkpoint=checkpoint) == 5
+    assert sum(row[1] for row in controller.activity("light1", 0)) == 30
+    controller.close()
+
+    reopened = SmartHomeController(log_path=str(tmp_path / "actions.db"))
+    assert sum(row[1] for row in reopened.activity("light1", 0)) == 30
+    reopened.close()
+
+def test_in_memory_log_is_compacted_below_capacity():
+    controller = SmartHomeController(log_capacity=100)
+    for i in range(90):
+        controller.toggle("light1")
+    assert Retention(controller).compact() == 40
+    assert len(controller.action_log) == 50
+    assert sum(row[1] for row in controller.activity("light1", 0)) == 40
+
+def test_in_memory_log_is_compacted_before_eviction():
+    controller = SmartHomeController(log_capacity=100)
+    retention = Retention(controller, interval=3600)
+    retention.start()
+    try:
+        for i in range(1000):
+            controller.toggle("light1")
+    finally:
+        retention.stop()
+    counted = sum(row[1] for row in controller.activity("light1", 0))
+    assert counted + len(controller.action_log) == 1000
+
+def test_rollups_survive_a_snapshot_restart(tmp_path):
+    path = str(tmp_path / "state.bin")
+    controller = SmartHomeController()
+    for i in range(10):
+        controller.toggle("light1")
+    Retention(controller, raw_window=-DAY).compact()
+    save_snapshot(controller, path)
+    restored = SmartHomeController(snapshot_path=path)
+    assert restored.activity("light1", 0) == controller.activity("light1", 0)
+    assert sum(row[1] for row in restored.activity("light1", 0)) == 10
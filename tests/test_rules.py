@@ -0,0 +1,52 @@
+from datetime import time
+
+from smart_home import POWER, Rule, SmartHomeController, State, default_rules, equals, generate_building
+
+def test_rule_fires_on_its_trigger_only():
+    controller = SmartHomeController()
+    controller.rules.add(Rule("tv", "tv1", "state", equals(State.ON), [("light1", "state", State.ON)]))
+    controller.toggle("light2")
+    assert controller.devices["light1"].state == State.OFF
+    controller.toggle("tv1")
+    assert controller.devices["light1"].state == State.ON
+    assert controller.rules.fired == 1
+    assert controller.check_totals()
+
+def test_time_window_may_wrap_midnight():
+    rule = Rule("night", "door1", "state", equals(State.UNLOCKED), [], after=time(22, 0), before=time(6, 0))
+    assert rule.in_window(time(23, 30))
+    assert rule.in_window(time(5, 59))
+    assert not rule.in_window(time(12, 0))
+
+def test_rule_cascade_is_limited():
+    controller = SmartHomeController()
+    # Rules switching each other's light forever
+    controller.rules.add(Rule("a", "light1", "state", lambda value: True, [("light2", "state", State.ON)]))
+    controller.rules.add(Rule("b", "light2", "state", lambda value: True, [("light1", "state", State.OFF)]))
+    controller.rules.add(Rule("c", "light1", "state", lambda value: True, [("light2", "state", State.OFF)]))
+    controller.toggle("light1")
+    assert controller.rules.suppressed > 0
+    assert controller.rules.fired <= controller.rules.max_firings
+    assert controller.check_totals()
+
+def test_rule_with_missing_device_does_not_break_the_toggle():
+    controller = SmartHomeController()
+    controller.rules.add(Rule("broken", POWER, "watts", lambda watts: True, [("fan9", "value", 1)]))
+    controller.toggle("light1")
+    assert controller.devices["light1"].state == State.ON
+    assert controller.rules.failed == 1
+    assert "failed" in controller.action_log.latest(1)[0]["action"]
+    assert controller.check_totals()
+
+def test_default_rules_skip_missing_devices():
+    controller = SmartHomeController(devices=generate_building(10))
+    assert default_rules(controller.devices) == []
+    controller = SmartHomeController()
+    for rule in default_rules(controller.devices):
+        controller.rules.add(rule)
+    controller.set_value("fan1", 0)
+    controller.rules.changed(POWER, "watts", 900)
+    assert controller.devices["fan1"].value == 0  # an idle fan is never raised
+    controller.set_value("fan1", 3)
+    controller.rules.changed(POWER, "watts", 900)
+    assert controller.devices["fan1"].value == 1
@@ -0,0 +1,36 @@
+import time
+
+from smart_home import RenderScheduler, SliderCoalescer
+
+def test_drag_commits_once_on_release():
+    previews, commits = [], []
+    slider = SliderCoalescer(22.0, previews.append, commits.append)
+    for value in (22.5, 23.0, 23.5, 24.0):
+        slider.change(value)
+    assert commits == []
+    slider.release(24.0)
+    assert previews == [22.5, 23.0, 23.5, 24.0]
+    assert commits == [24.0]
+    slider.release(24.0)  # back where it was committed
+    assert commits == [24.0]
+
+def test_window_mode_commits_after_a_quiet_period():
+    commits = []
+    slider = SliderCoalescer(0, lambda value: None, commits.append, mode="window", window=0.05)
+    for value in (1, 2, 3):
+        slider.change(value)
+    time.sleep(0.3)
+    assert commits == [3]
+
+def test_marks_within_a_frame_are_sent_in_one_update():
+    updates = []
+    scheduler = RenderScheduler(lambda *controls: updates.append(controls), interval=0.05)
+    card, label = object(), object()
+    scheduler.mark(card)
+    scheduler.mark(label, card)
+    scheduler.mark(card)
+    time.sleep(0.3)
+    assert updates == [(card, label)]
+    assert (scheduler.flushes, scheduler.coalesced) == (1, 2)
+    scheduler.flush()  # nothing dirty
+    assert scheduler.flushes == 1
@@ -0,0 +1,31 @@
+from smart_home import SmartHomeController, load_snapshot, save_snapshot
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "state.bin")
+    controller = SmartHomeController()
+    controller.toggle("light1")
+    controller.set_value("thermostat1", 24.5)
+    controller.power_series.add(1_000_000.0, 123.0)
+    save_snapshot(controller, path)
+
+    restored = SmartHomeController(snapshot_path=path)
+    assert restored.devices["light1"].state == controller.devices["light1"].state
+    assert restored.devices["thermostat1"].value == 24.5
+    assert restored.action_log.latest(5) == controller.action_log.latest(5)
+    assert restored.power_series.resolutions[60].dump() == controller.power_series.resolutions[60].dump()
+    assert restored.check_totals()
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "state.bin"
+    controller = SmartHomeController()
+    controller.toggle("light1")
+    save_snapshot(controller, str(path))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert load_snapshot(str(path)) is None
+    path.write_bytes(bytes(data[:20]))
+    assert load_snapshot(str(path)) is None
+    assert load_snapshot(str(tmp_path / "missing.bin")) is None
+    restored = SmartHomeController(snapshot_path=str(path))
+    assert restored.devices["light1"].state != controller.devices["light1"].state
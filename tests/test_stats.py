@@ -0,0 +1,8 @@
+from smart_home import percentile
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    values = list(range(100, 0, -1))
+    assert percentile(values, 0.5) == 51
+    assert percentile(values, 0.99) == 100
+    assert percentile(values, 1.0) == 100
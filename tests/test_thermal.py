@@ -0,0 +1,33 @@
+import pytest
+
+from smart_home import SmartHomeController
+from smart_home.thermal import THERMOSTAT_BAND, ThermalSimulator
+
+def test_thermostat_heats_up_to_its_setpoint_and_stops():
+    controller = SmartHomeController()
+    simulator = ThermalSimulator(controller, temperature=18.0)
+    living = simulator.rooms.index("Living Room")
+    assert simulator.step(10.0, 18.0).tolist() == [0]  # 4 °C below the setpoint: heating
+    assert simulator.modes.tolist() == [1]
+    for _ in range(10000):
+        if len(simulator.step(10.0, 18.0)):
+            break
+    assert simulator.modes.tolist() == [0]
+    assert simulator.temperatures[living] == pytest.approx(22.0, abs=0.1)
+    assert simulator.thermostat_watts().tolist() == [0.0]
+
+def test_band_keeps_an_idle_thermostat_idle():
+    controller = SmartHomeController()
+    simulator = ThermalSimulator(controller, temperature=22.0 - THERMOSTAT_BAND / 2)
+    assert len(simulator.step(10.0, 22.0)) == 0
+    assert simulator.modes.tolist() == [0]
+
+def test_rooms_without_a_thermostat_drift_to_the_outdoors():
+    controller = SmartHomeController()
+    controller.set_value("fan1", 3)
+    simulator = ThermalSimulator(controller, temperature=20.0)
+    bedroom = simulator.rooms.index("Bedroom")  # fan at 3 and a light that is off
+    hallway = simulator.rooms.index("Hallway")  # a locked door drawing 5 W
+    for _ in range(100):
+        simulator.step(10.0, 0.0)
+    assert 0.0 < simulator.temperatures[bedroom] < simulator.temperatures[hallway] < 20.0